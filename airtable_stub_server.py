@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Lokaler Airtable API Stand-in (für Tests & Lasttests der Sync-Skripte)
+
+Emuliert die genutzten Endpoints:
+  GET    /v0/<base>/<table>            Liste (pageSize, offset, fields[], filterByFormula)
+  GET    /v0/<base>/<table>/<id>       Einzelner Record
+  POST   /v0/<base>/<table>            Create (max 10)
+  PATCH  /v0/<base>/<table>[/<id>]     Update (max 10)
+  PUT    /v0/<base>/<table>[/<id>]     Replace (max 10)
+  DELETE /v0/<base>/<table>[/<id>]     Delete (records[], max 10)
+
+Attachment-Felder ([{"url": ...}]) bekommen id/filename wie bei Airtable.
+Rate Limit (5 Requests/Sekunde pro Base) → 429, Latenz per Env einstellbar.
+
+Nutzung:
+  python3 airtable_stub_server.py
+  export AIRTABLE_API_URL=http://127.0.0.1:8787
+  python3 sync_airtable_plugin.py
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import re
+import json
+import time
+import random
+import string
+import threading
+from collections import deque, OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+HOST = os.getenv("STUB_HOST", "127.0.0.1")
+PORT = int(os.getenv("STUB_PORT", "8787"))
+
+RATE_LIMIT = int(os.getenv("STUB_RATE_LIMIT", "5"))       # Requests/Sekunde pro Base (0 = aus)
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))     # Mittlere zusätzliche Latenz
+JITTER_MS = float(os.getenv("STUB_JITTER_MS", "0"))
+
+MAX_BATCH = 10
+MAX_PAGE_SIZE = 100
+
+# ===========================================================================
+# FORMULA (Subset von filterByFormula)
+# ===========================================================================
+
+TOKEN_RE = re.compile(r"\s*(\{[^}]*\}|'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|-?\d+(?:\.\d+)?|!=|>=|<=|[=<>(),]|[A-Za-z_]+)")
+
+def tokenize_formula(formula: str) -> List[str]:
+    tokens, pos = [], 0
+    formula = formula.strip()
+    while pos < len(formula):
+        m = TOKEN_RE.match(formula, pos)
+        if not m:
+            raise ValueError(f"Formel nicht unterstützt: {formula[pos:]}")
+        tokens.append(m.group(1))
+        pos = m.end()
+    return tokens
+
+def parse_formula(formula: str):
+    """
+    Unterstützt: {Feld}, 'text', Zahlen, = != < > <= >=,
+    AND(...), OR(...), NOT(x), BLANK(), TRUE(), FALSE()
+    Gibt eine Funktion fields → bool/Wert zurück.
+    """
+    tokens = tokenize_formula(formula)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take(expected=None):
+        nonlocal pos
+        tok = peek()
+        # Abgeschnittene Formel → ValueError (= 422), kein AttributeError auf None
+        if tok is None:
+            raise ValueError(f"Formel unvollständig, erwartet {expected or 'Ausdruck'}")
+        if expected is not None and tok != expected:
+            raise ValueError(f"Erwartet {expected}, gefunden {tok}")
+        pos += 1
+        return tok
+
+    def atom():
+        tok = take()
+        if tok.startswith("{"):
+            name = tok[1:-1]
+            return lambda f: f.get(name, "")
+        if tok[0] in "'\"":
+            value = tok[1:-1].replace("\\'", "'").replace('\\"', '"')
+            return lambda f: value
+        if re.fullmatch(r"-?\d+(?:\.\d+)?", tok):
+            value = float(tok)
+            return lambda f: value
+        if tok == "(":
+            inner = comparison()
+            take(")")
+            return inner
+
+        name = tok.upper()
+        take("(")
+        args = []
+        while peek() != ")":
+            args.append(comparison())
+            if peek() == ",":
+                take(",")
+        take(")")
+
+        if name == "AND":
+            return lambda f: all(truthy(a(f)) for a in args)
+        if name == "OR":
+            return lambda f: any(truthy(a(f)) for a in args)
+        if name == "NOT":
+            if len(args) != 1:
+                raise ValueError("NOT erwartet genau ein Argument")
+            return lambda f: not truthy(args[0](f))
+        if name == "BLANK":
+            return lambda f: ""
+        if name == "TRUE":
+            return lambda f: True
+        if name == "FALSE":
+            return lambda f: False
+        raise ValueError(f"Funktion nicht unterstützt: {name}")
+
+    def comparison():
+        left = atom()
+        op = peek()
+        if op in ("=", "!=", "<", ">", "<=", ">="):
+            take()
+            right = atom()
+            return lambda f: compare(left(f), op, right(f))
+        return left
+
+    expr = comparison()
+    if pos != len(tokens):
+        raise ValueError(f"Unerwartetes Token: {peek()}")
+    return expr
+
+def truthy(value) -> bool:
+    return value not in (None, "", 0, False, [])
+
+def compare(a, op, b) -> bool:
+    if isinstance(a, (int, float)) or isinstance(b, (int, float)):
+        try:
+            a, b = float(a or 0), float(b or 0)
+        except (TypeError, ValueError):
+            a, b = str(a), str(b)
+    else:
+        a, b = "" if a is None else str(a), "" if b is None else str(b)
+
+    return {
+        "=": a == b, "!=": a != b,
+        "<": a < b, ">": a > b, "<=": a <= b, ">=": a >= b,
+    }[op]
+
+# ===========================================================================
+# DATENHALTUNG
+# ===========================================================================
+
+def random_id(prefix: str) -> str:
+    return prefix + "".join(random.choices(string.ascii_letters + string.digits, k=14))
+
+def normalize_fields(fields: dict) -> dict:
+    """Leere Werte entfernen (wie Airtable), Attachments anreichern"""
+    result = {}
+    for name, value in fields.items():
+        if value in (None, "", [], False):
+            continue
+        if isinstance(value, list) and value and all(isinstance(v, dict) and "url" in v for v in value):
+            value = [
+                {
+                    "id": v.get("id") or random_id("att"),
+                    "url": v["url"],
+                    "filename": v.get("filename") or v["url"].rsplit("/", 1)[-1] or "file",
+                    "type": v.get("type", "application/octet-stream"),
+                }
+                for v in value
+            ]
+        result[name] = value
+    return result
+
+class AirtableStub:
+    """In-Memory Tabellen + Rate Limiter + Request-Statistik"""
+
+    def __init__(self, rate_limit: int = RATE_LIMIT,
+                 latency_ms: float = LATENCY_MS, jitter_ms: float = JITTER_MS):
+        self.rate_limit = rate_limit
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tables: Dict[tuple, "OrderedDict[str, dict]"] = {}
+        self.windows: Dict[str, deque] = {}
+        self.stats = {"requests": 0, "rate_limited": 0, "by_method": {}}
+        self.lock = threading.Lock()
+
+    def table(self, base: str, table: str) -> "OrderedDict[str, dict]":
+        return self.tables.setdefault((base, table), OrderedDict())
+
+    def allow(self, base: str) -> bool:
+        """Sliding Window: max rate_limit Requests pro Sekunde und Base"""
+        with self.lock:
+            self.stats["requests"] += 1
+            if not self.rate_limit:
+                return True
+
+            now = time.monotonic()
+            window = self.windows.setdefault(base, deque())
+            while window and now - window[0] >= 1.0:
+                window.popleft()
+
+            if len(window) >= self.rate_limit:
+                self.stats["rate_limited"] += 1
+                return False
+
+            window.append(now)
+            return True
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            ms = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+            time.sleep(ms / 1000)
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {"requests": 0, "rate_limited": 0, "by_method": {}}
+
+# ===========================================================================
+# HTTP
+# ===========================================================================
+
+class ApiError(Exception):
+    def __init__(self, status: int, type_: str, message: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.type = type_
+        self.message = message
+
+def list_records(records: "OrderedDict[str, dict]", params: dict) -> dict:
+    page_size = min(MAX_PAGE_SIZE, int(params.get("pageSize", [MAX_PAGE_SIZE])[0]))
+    offset = int(params.get("offset", ["0"])[0] or 0)
+    fields = params.get("fields[]", [])
+    formula = params.get("filterByFormula", [""])[0]
+    max_records = int(params.get("maxRecords", ["0"])[0] or 0)
+
+    rows = list(records.values())
+    if formula:
+        try:
+            predicate = parse_formula(formula)
+        except ValueError as e:
+            raise ApiError(422, "INVALID_FILTER_BY_FORMULA", str(e))
+        rows = [r for r in rows if truthy(predicate(r["fields"]))]
+    if max_records:
+        rows = rows[:max_records]
+
+    page = rows[offset:offset + page_size]
+    if fields:
+        page = [dict(r, fields={k: v for k, v in r["fields"].items() if k in fields}) for r in page]
+
+    result = {"records": page}
+    if offset + page_size < len(rows):
+        result["offset"] = str(offset + page_size)
+    return result
+
+def batch(payload: dict, record_id: Optional[str]) -> List[dict]:
+    if record_id:
+        return [dict(payload, id=record_id)]
+    if "records" in payload:
+        records = payload["records"]
+    elif "fields" in payload:
+        records = [payload]
+    else:
+        raise ApiError(422, "INVALID_REQUEST_MISSING_FIELDS", "records fehlt")
+    if len(records) > MAX_BATCH:
+        raise ApiError(422, "INVALID_RECORDS", f"Max {MAX_BATCH} Records pro Request")
+    return records
+
+def make_handler(stub: AirtableStub):
+    class Handler(BaseHTTPRequestHandler):
+        def handle_request(self, method: str):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            params = parse_qs(url.query)
+
+            with stub.lock:
+                by_method = stub.stats["by_method"]
+                by_method[method] = by_method.get(method, 0) + 1
+
+            try:
+                if len(parts) not in (3, 4) or parts[0] != "v0":
+                    raise ApiError(404, "NOT_FOUND")
+                if not self.headers.get("Authorization", "").startswith("Bearer "):
+                    raise ApiError(401, "AUTHENTICATION_REQUIRED")
+
+                base, table_name = parts[1], parts[2]
+                record_id = parts[3] if len(parts) == 4 else None
+
+                if not stub.allow(base):
+                    raise ApiError(429, "RATE_LIMIT_REACHED", "Rate limit exceeded. Please try again later")
+
+                stub.delay()
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+                with stub.lock:
+                    result = self.dispatch(method, stub.table(base, table_name), record_id, params, payload)
+                self.send_json(200, result)
+
+            except ApiError as e:
+                self.send_json(e.status, {"error": {"type": e.type, "message": e.message}})
+            except (ValueError, KeyError) as e:
+                self.send_json(422, {"error": {"type": "INVALID_REQUEST_UNKNOWN", "message": str(e)}})
+
+        def dispatch(self, method, records, record_id, params, payload):
+            if method == "GET":
+                if record_id:
+                    if record_id not in records:
+                        raise ApiError(404, "NOT_FOUND")
+                    return records[record_id]
+                return list_records(records, params)
+
+            if method == "POST":
+                created = []
+                for r in batch(payload, None):
+                    rec = {
+                        "id": random_id("rec"),
+                        "createdTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+                        "fields": normalize_fields(r.get("fields", {})),
+                    }
+                    records[rec["id"]] = rec
+                    created.append(rec)
+                return created[0] if "records" not in payload else {"records": created}
+
+            if method in ("PATCH", "PUT"):
+                updated = []
+                for r in batch(payload, record_id):
+                    rec = records.get(r.get("id"))
+                    if rec is None:
+                        raise ApiError(404, "NOT_FOUND", f"Record {r.get('id')} nicht gefunden")
+                    fields = r.get("fields", {})
+                    if method == "PATCH":
+                        fields = dict(rec["fields"], **fields)
+                    rec["fields"] = normalize_fields(fields)
+                    updated.append(rec)
+                return updated[0] if record_id else {"records": updated}
+
+            if method == "DELETE":
+                ids = [record_id] if record_id else params.get("records[]", [])
+                if len(ids) > MAX_BATCH:
+                    raise ApiError(422, "INVALID_RECORDS", f"Max {MAX_BATCH} Records pro Request")
+                deleted = []
+                for rid in ids:
+                    if records.pop(rid, None) is None:
+                        raise ApiError(404, "NOT_FOUND", f"Record {rid} nicht gefunden")
+                    deleted.append({"id": rid, "deleted": True})
+                return deleted[0] if record_id else {"records": deleted}
+
+            raise ApiError(405, "METHOD_NOT_ALLOWED")
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def do_PATCH(self):
+            self.handle_request("PATCH")
+
+        def do_PUT(self):
+            self.handle_request("PUT")
+
+        def do_DELETE(self):
+            self.handle_request("DELETE")
+
+        def send_json(self, status: int, data):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "30")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_server(stub: AirtableStub, host: str = HOST, port: int = PORT) -> ThreadingHTTPServer:
+    """Server im Hintergrund-Thread starten (port=0 → freier Port)"""
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main():
+    print("=" * 80)
+    print("AIRTABLE STUB SERVER")
+    print("=" * 80)
+
+    stub = AirtableStub()
+    server = ThreadingHTTPServer((HOST, PORT), make_handler(stub))
+    print(f"\n[STUB] http://{HOST}:{PORT}")
+    print(f"  Rate Limit: {RATE_LIMIT or 'aus'} req/s pro Base")
+    print(f"  Latenz:     {LATENCY_MS:.0f} ± {JITTER_MS:.0f} ms")
+    print(f"\n  export AIRTABLE_API_URL=http://{HOST}:{PORT}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n[STUB] Beendet - {stub.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Lasttest der Airtable-Syncs gegen den lokalen Stand-in (airtable_stub_server.py)
+
+Misst pro Größe (1k - 50k Records):
+  full-create   Voll-Sync in eine leere Tabelle
+  full-rebuild  Voll-Sync in eine gefüllte Tabelle (Delete-All + Create)
+  incremental   Gezielter Upsert von ~5% geänderten Records (wie watch_mode.py)
+
+Batch-Pause, Backoff, Rate Limit und Latenz sind einstellbar - so lassen sich
+Batching-Einstellungen offline tunen, ohne Airtable-Quota zu verbrauchen.
+
+Nutzung:
+  python3 benchmark_airtable_sync.py --sizes 1000 5000
+  python3 benchmark_airtable_sync.py --sizes 50000 --batch-delay 0.2 --latency-ms 150
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from typing import Dict
+
+import sync_airtable_chatbot as chatbot
+import sync_airtable_plugin as plugin
+from airtable_stub_server import AirtableStub, start_server
+from benchmark_cpu import make_dataset
+from immoscout_mobile_api_scraper import parse_listing, parse_expose_details, export_csv
+from profiling import Profiler
+from snapshot import load_rows
+from watch_mode import push_changes
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+DEFAULT_SIZES = [1_000]
+
+# Anteil geänderter Records im inkrementellen Szenario
+CHANGE_RATIO = 0.05
+
+TARGETS = {
+    "plugin": (plugin, "expose_id", plugin.csv_to_airtable_plugin_record),
+    "chatbot": (chatbot, "Objektnummer", chatbot.csv_to_airtable_record),
+}
+
+# ===========================================================================
+# SZENARIEN
+# ===========================================================================
+
+def write_snapshot(size: int, csv_file: str):
+    data = make_dataset(size)
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        props = [parse_listing(l) for l in data["listings"]]
+        for prop, expose in zip(props, data["exposes"]):
+            prop.update(parse_expose_details(expose))
+            # Chatbot synced nur aktive - im Benchmark alle Records zählen lassen
+            prop["status"] = "Verfügbar"
+        export_csv(props, csv_file)
+
+def timed(stub: AirtableStub, func) -> Dict[str, float]:
+    stub.reset_stats()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        func()
+    elapsed = time.perf_counter() - start
+    stats = dict(stub.stats)
+    return {
+        "seconds": elapsed,
+        "requests": stats["requests"],
+        "rate_limited": stats["rate_limited"],
+    }
+
+def run_size(stub: AirtableStub, target: str, size: int, workdir: str) -> Dict[str, dict]:
+    module, key_field, to_record = TARGETS[target]
+    csv_file = os.path.join(workdir, f"sync_{size}.csv")
+    write_snapshot(size, csv_file)
+
+    module.CSV_FILE = csv_file
+    module.AIRTABLE_TABLE = f"tbl{target.capitalize()}{size}"
+
+    results = {}
+    results["full-create"] = timed(stub, lambda: module.run(Profiler(target, None)))
+    results["full-rebuild"] = timed(stub, lambda: module.run(Profiler(target, None)))
+
+    rows = load_rows(csv_file)
+    changed = random.Random(size).sample(rows, max(1, int(len(rows) * CHANGE_RATIO)))
+    for row in changed:
+        row["preis"] = f"{random.randint(50, 1500) * 1000:,} €".replace(",", ".")
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        records = {r["expose_id"]: to_record(r) for r in changed}
+    results["incremental"] = timed(stub, lambda: push_changes(module, key_field, records, []))
+
+    table = stub.table(module.AIRTABLE_BASE, module.AIRTABLE_TABLE)
+    results["full-rebuild"]["records"] = len(table)
+    return results
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Airtable Sync Lasttest (lokaler Stub)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--target", choices=sorted(TARGETS), default="plugin")
+    parser.add_argument("--batch-delay", type=float, default=plugin.AIRTABLE_BATCH_DELAY,
+                        help="Pause zwischen Batches (Sekunden)")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Wartezeit nach 429 (Sekunden)")
+    parser.add_argument("--rate-limit", type=int, default=5, help="Requests/Sekunde (0 = aus)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    stub = AirtableStub(rate_limit=args.rate_limit, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    server = start_server(stub, port=0)
+    api_url = f"http://127.0.0.1:{server.server_port}"
+
+    module = TARGETS[args.target][0]
+    module.AIRTABLE_API_URL = api_url
+    module.AIRTABLE_TOKEN = "stub"
+    module.AIRTABLE_BASE = "appBenchmark"
+    module.AIRTABLE_BATCH_DELAY = args.batch_delay
+    module.RATE_LIMIT_BACKOFF = args.backoff
+    os.environ["AIRTABLE_AUTO_CONFIRM"] = "true"
+
+    print("=" * 80)
+    print(f"AIRTABLE SYNC BENCHMARK ({args.target.upper()}) → {api_url}")
+    print("=" * 80)
+    print(f"Batch-Pause: {args.batch_delay}s | Backoff: {args.backoff}s | "
+          f"Rate Limit: {args.rate_limit or 'aus'}/s | Latenz: {args.latency_ms:.0f}±{args.jitter_ms:.0f}ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"\n[BENCH] {size:,} Records")
+            results = run_size(stub, args.target, size, workdir)
+            for name, r in results.items():
+                rps = r["requests"] / r["seconds"] if r["seconds"] else 0
+                print(f"  {name:14} {r['seconds']:>9.1f}s  {r['requests']:>7,} Requests "
+                      f"({rps:4.1f}/s)  429: {r['rate_limited']:>5,}")
+            print(f"  Tabelle nach Rebuild: {results['full-rebuild']['records']:,} Records")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Micro-Benchmarks für die reinen CPU-Teile
+parse_listing, Exposé-Parsing, export_csv & Airtable-Mapping (Chatbot/Plugin)
+
+Erzeugt synthetische Listings & Exposés (1k / 10k / 100k), misst Durchsatz
+und Speicher-Peak (tracemalloc) pro Funktion und vergleicht mit gespeicherten
+Baselines. Regressionen werden markiert (Exit-Code 1 mit --check).
+
+Nutzung:
+  python3 benchmark_cpu.py                      # messen & vergleichen
+  python3 benchmark_cpu.py --sizes 1000 10000   # nur kleine Größen
+  python3 benchmark_cpu.py --save-baseline      # Baseline aktualisieren
+  python3 benchmark_cpu.py --check              # Exit 1 bei Regression oder fehlender Baseline
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import List, Dict, Callable
+
+from immoscout_mobile_api_scraper import parse_listing, parse_expose_details, export_csv
+from sync_airtable_chatbot import csv_to_airtable_record
+from sync_airtable_plugin import csv_to_airtable_plugin_record
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+# Toleranz bevor eine Abweichung als Regression gilt (20%)
+REGRESSION_THRESHOLD = 0.20
+
+SEED = 42
+
+# Wiederholungen pro Messung (bester Lauf zählt - reduziert Rauschen)
+REPEATS = 3
+
+# ===========================================================================
+# SYNTHETISCHE DATEN
+# ===========================================================================
+
+ORTE = [("90402", "Nürnberg"), ("90762", "Fürth"), ("91052", "Erlangen"),
+        ("91126", "Schwabach"), ("90513", "Zirndorf"), ("91207", "Lauf")]
+TYPEN = ["Wohnung", "Haus", "Grundstück", "Büro"]
+WORTE = ("helle ruhige großzügige moderne Wohnung Balkon Garten Keller Stellplatz "
+         "Einbauküche Parkett Fußbodenheizung Lage Nähe Zentrum Bad Dusche "
+         "Wanne Aufzug Terrasse saniert renoviert Altbau Neubau").split()
+
+def make_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORTE) for _ in range(words)) + "."
+
+def make_listing(rng: random.Random, i: int) -> dict:
+    """Eintrag wie von /searchlistings"""
+    plz, ort = rng.choice(ORTE)
+    price = rng.randint(50, 1500) * 1000
+    return {
+        "exposeId": 100_000_000 + i,
+        "isBuy": rng.random() < 0.7,
+        "type": rng.choice(TYPEN),
+        "price": price,
+        "priceFormatted": f"{price:,}".replace(",", "."),
+        "postcode": plz,
+        "city": ort,
+        "region": "Bayern",
+        "livingSpace": round(rng.uniform(25, 250), 2),
+        "numberOfRooms": rng.randint(1, 8),
+        "isReference": rng.random() < 0.3,
+    }
+
+def make_expose(rng: random.Random, i: int) -> dict:
+    """Exposé-JSON wie von /expose/{id} (Mobile API)"""
+    sections = [{"type": "TITLE", "title": f"Objekt {i}: " + make_text(rng, 8)}]
+
+    for title in ("Objektbeschreibung", "Ausstattung", "Lage", "Sonstiges"):
+        sections.append({"type": "TEXT_AREA", "title": title, "text": make_text(rng, rng.randint(40, 250))})
+
+    sections.append({
+        "type": "MEDIA",
+        "media": [
+            {
+                "type": "PICTURE",
+                "previewImageUrl": f"https://pictures.example/{i}/{n}/preview.jpg",
+                "fullImageUrl": f"https://pictures.example/{i}/{n}/full.jpg",
+                "caption": make_text(rng, 3),
+            }
+            for n in range(rng.randint(3, 25))
+        ],
+    })
+
+    attributes = [{"label": "Baujahr", "text": str(rng.randint(1900, 2024))},
+                  {"label": "Endenergiebedarf", "text": f"{rng.randint(30, 250)} kWh/(m²*a)"}]
+    attributes += [{"label": f"{rng.choice(WORTE).capitalize()}:", "value": rng.choice(WORTE)}
+                   for _ in range(18)]
+    sections.append({"type": "ATTRIBUTE_LIST", "attributes": attributes})
+
+    return {"sections": sections}
+
+def make_dataset(size: int) -> Dict[str, list]:
+    rng = random.Random(SEED)
+    listings = [make_listing(rng, i) for i in range(size)]
+    exposes = [make_expose(rng, i) for i in range(size)]
+    return {"listings": listings, "exposes": exposes}
+
+# ===========================================================================
+# MESSUNG
+# ===========================================================================
+
+def measure(func: Callable[[], object], items: int, repeats: int = REPEATS) -> dict:
+    """Laufzeit (bester von `repeats` Läufen, ohne tracemalloc) + Speicher-Peak"""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        elapsed = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            elapsed = min(elapsed, time.perf_counter() - start)
+
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "ops_per_sec": round(items / elapsed, 1) if elapsed else float("inf"),
+        "us_per_op": round(elapsed / items * 1e6, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+def run_size(size: int, workdir: str) -> Dict[str, dict]:
+    data = make_dataset(size)
+    listings, exposes = data["listings"], data["exposes"]
+
+    # Vorbereitete Zwischenstände für die nachgelagerten Funktionen
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        props = [parse_listing(l) for l in listings]
+        for prop, expose in zip(props, exposes):
+            prop.update(parse_expose_details(expose))
+
+        csv_path = os.path.join(workdir, f"bench_{size}.csv")
+        export_csv([dict(p) for p in props], csv_path)
+
+    def run_export():
+        export_csv([dict(p) for p in props], csv_path)
+
+    with open(csv_path, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    benchmarks = {
+        "parse_listing": lambda: [parse_listing(l) for l in listings],
+        "parse_expose_details": lambda: [parse_expose_details(e) for e in exposes],
+        "export_csv": run_export,
+        "csv_to_airtable_record": lambda: [csv_to_airtable_record(r) for r in rows],
+        "csv_to_airtable_plugin_record": lambda: [csv_to_airtable_plugin_record(r) for r in rows],
+    }
+
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = measure(func, size)
+        r = results[name]
+        print(f"  {name:32} {r['ops_per_sec']:>12,.0f} ops/s  "
+              f"{r['us_per_op']:>9.2f} µs/op  peak {r['peak_kib']:>10,.0f} KiB")
+
+    return results
+
+# ===========================================================================
+# BASELINE
+# ===========================================================================
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]],
+            threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Liste der Regressionen (langsamer oder mehr Speicher als Baseline)"""
+    regressions = []
+
+    for size, funcs in results.items():
+        for name, r in funcs.items():
+            base = baseline.get(size, {}).get(name)
+            if not base:
+                continue
+
+            if r["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+                regressions.append(
+                    f"{name} @ {size}: {r['ops_per_sec']:,.0f} ops/s "
+                    f"(Baseline {base['ops_per_sec']:,.0f})"
+                )
+            if r["peak_kib"] > base["peak_kib"] * (1 + threshold):
+                regressions.append(
+                    f"{name} @ {size}: peak {r['peak_kib']:,.0f} KiB "
+                    f"(Baseline {base['peak_kib']:,.0f})"
+                )
+
+    return regressions
+
+def uncovered(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]]) -> List[str]:
+    """Benchmarks ohne Baseline-Eintrag (mit --check ein Fehler, nicht stillschweigend ok)"""
+    return [
+        f"{name} @ {size}"
+        for size, funcs in results.items()
+        for name in funcs
+        if not baseline.get(size, {}).get(name)
+    ]
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU Micro-Benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Exit 1 bei Regression oder fehlender Baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.check and not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"[ERROR] --check ohne Baseline ({args.baseline}) - erst mit --save-baseline anlegen")
+        sys.exit(1)
+
+    print("=" * 80)
+    print("CPU MICRO-BENCHMARKS")
+    print("=" * 80)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"\n[BENCH] {size:,} Items")
+            results[str(size)] = run_size(size, workdir)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    missing = uncovered(results, baseline)
+
+    print("\n" + "=" * 80)
+    if missing:
+        print(f"⚠️  {len(missing)} Benchmarks ohne Baseline ({args.baseline}) - mit --save-baseline anlegen:")
+        for m in missing:
+            print(f"  - {m}")
+    if regressions:
+        print(f"⚠️  {len(regressions)} Regressionen (> {args.threshold:.0%}):")
+        for r in regressions:
+            print(f"  - {r}")
+    elif baseline:
+        print("✅ Keine Regressionen")
+    print("=" * 80)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"[BENCH] ✅ Baseline gespeichert: {args.baseline}")
+
+    # Fehlende Baseline-Einträge zählen als Fehler - sonst ist --check in CI wirkungslos
+    if args.check and (regressions or (missing and not args.save_baseline)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
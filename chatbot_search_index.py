@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Lokaler Volltext-Suchindex für den Chatbot
+SQLite FTS5 über Titel, VOLLE Beschreibung, Ausstattung, Ort & Region
+
+Statt jede Chatbot-Anfrage über Airtable zu schicken, wird beim Scrapen ein
+lokaler Index gebaut. Abfrage = Millisekunden, keine Kürzung der Beschreibung.
+Wie die Chatbot-Tabelle: nur aktive Listings (ohne "Vermarktet").
+
+Nutzung:
+  python3 chatbot_search_index.py build
+  python3 chatbot_search_index.py search "Wohnung mit Balkon Fürth"
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+from typing import List, Dict, Iterable, Tuple
+
+from snapshot import CSV_FILE, load_rows
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+INDEX_FILE = "immoscout_search.db"
+
+# Passage-Größe für die Beschreibung (Zeichen)
+PASSAGE_LENGTH = 600
+
+# Gewichtung pro Feld (multipliziert den BM25-Score)
+FIELD_WEIGHTS = {
+    "titel": 2.0,
+    "ort": 1.5,
+    "ausstattung": 1.2,
+    "beschreibung": 1.0,
+}
+
+# Felder, deren Änderung einen Re-Index auslöst
+INDEXED_FIELDS = ("titel", "beschreibung", "ausstattung", "ort", "region")
+
+SNIPPET_WORDS = 24
+
+# Stemmer: Endungen (längste zuerst) & Mindestlänge des Stamms
+# (balkon bleibt balkon, häuser → haus statt hau)
+SUFFIXES = ("ern", "em", "en", "er", "es", "nd", "e", "s")
+MIN_STEM_LENGTH = 4
+
+# Erhöhen, wenn sich die Tokenisierung ändert → einmaliger Re-Index
+TOKENIZER_VERSION = 2
+
+# Häufige deutsche Füllwörter (werden nicht indexiert)
+STOPWORDS = {
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "eines",
+    "einem", "einen", "und", "oder", "mit", "von", "vom", "zu", "zum",
+    "zur", "im", "in", "an", "am", "auf", "aus", "bei", "fur", "ist", "sind",
+    "wird", "werden", "es", "sie", "er", "wir", "ich", "du", "ihr", "sich",
+    "nicht", "auch", "als", "wie", "so", "dass", "nach", "uber", "unter",
+    "hat", "haben", "noch", "nur", "sehr", "hier", "dieser", "diese",
+    "dieses", "gibt", "suche", "suchen", "bitte",
+}
+
+# ===========================================================================
+# DEUTSCHE TOKENISIERUNG
+# ===========================================================================
+
+UMLAUTS = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+WORD_RE = re.compile(r"\S+")
+
+def stem(token: str) -> str:
+    """Leichter deutscher Stemmer: Flexionsendungen, Stamm nie kürzer als MIN_STEM_LENGTH"""
+    if token.isdigit():
+        return token
+
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in SUFFIXES:
+            if suffix == "s" and token.endswith("ss"):
+                continue  # ß → ss gehört zum Stamm
+            if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+                token = token[:-len(suffix)]
+                stripped = True
+                break
+
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Text → normalisierte Stämme (klein, ohne Umlaute, ohne Stopwörter)"""
+    text = text.lower().translate(UMLAUTS)
+    return [stem(t) for t in TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+# ===========================================================================
+# PASSAGEN
+# ===========================================================================
+
+def split_passages(text: str, size: int = PASSAGE_LENGTH) -> List[str]:
+    """Teile Text an Absatz-/Satzgrenzen in Passagen von ca. `size` Zeichen"""
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            sentences.extend(s for s in re.split(r"(?<=[.!?])\s+", paragraph) if s)
+
+    passages = []
+    current = ""
+    for sentence in sentences:
+        if current and len(current) + len(sentence) + 1 > size:
+            passages.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+
+    if current:
+        passages.append(current)
+
+    return passages
+
+def listing_passages(row: dict) -> Iterable[Tuple[str, str]]:
+    """(feld, text) Passagen eines Listings"""
+    if row.get("titel"):
+        yield "titel", row["titel"]
+
+    standort = " ".join(
+        p for p in (row.get("plz", ""), row.get("ort", ""), row.get("region", "")) if p
+    )
+    if standort:
+        yield "ort", standort
+
+    if row.get("ausstattung"):
+        yield "ausstattung", row["ausstattung"]
+
+    for passage in split_passages(row.get("beschreibung", "")):
+        yield "beschreibung", passage
+
+def content_hash(row: dict) -> str:
+    payload = json.dumps([TOKENIZER_VERSION] + [row.get(f, "") for f in INDEXED_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+# ===========================================================================
+# INDEX
+# ===========================================================================
+
+def connect(index_file: str = INDEX_FILE) -> sqlite3.Connection:
+    conn = sqlite3.connect(index_file)
+    conn.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+            tokens,
+            expose_id UNINDEXED,
+            field UNINDEXED,
+            text UNINDEXED,
+            tokenize = 'unicode61'
+        );
+        CREATE TABLE IF NOT EXISTS listings (
+            expose_id TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL
+        );
+    """)
+    return conn
+
+def index_listing(conn: sqlite3.Connection, row: dict):
+    """(Re-)Indexiere ein einzelnes Listing"""
+    expose_id = str(row.get("expose_id", ""))
+    conn.execute("DELETE FROM passages WHERE expose_id = ?", (expose_id,))
+    conn.executemany(
+        "INSERT INTO passages (tokens, expose_id, field, text) VALUES (?, ?, ?, ?)",
+        [
+            (" ".join(tokenize(text)), expose_id, field, text)
+            for field, text in listing_passages(row)
+        ],
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO listings (expose_id, content_hash) VALUES (?, ?)",
+        (expose_id, content_hash(row)),
+    )
+
+def remove_listing(conn: sqlite3.Connection, expose_id: str):
+    conn.execute("DELETE FROM passages WHERE expose_id = ?", (expose_id,))
+    conn.execute("DELETE FROM listings WHERE expose_id = ?", (expose_id,))
+
+def update_index(rows: List[dict], index_file: str = INDEX_FILE, prune: bool = True) -> Dict[str, int]:
+    """
+    Inkrementelles Update: nur geänderte Listings werden neu indexiert.
+    Vermarktete Listings werden übersprungen (und beim Prune entfernt) -
+    der Chatbot soll keine IDs finden, die nicht in seiner Tabelle stehen.
+    """
+    stats = {"neu": 0, "geaendert": 0, "entfernt": 0, "unveraendert": 0}
+
+    conn = connect(index_file)
+    with conn:
+        known = dict(conn.execute("SELECT expose_id, content_hash FROM listings"))
+        current_ids = set()
+
+        for row in rows:
+            expose_id = str(row.get("expose_id", ""))
+            if not expose_id or row.get("status", "") == "Vermarktet":
+                continue
+            current_ids.add(expose_id)
+
+            old_hash = known.get(expose_id)
+            if old_hash == content_hash(row):
+                stats["unveraendert"] += 1
+                continue
+
+            index_listing(conn, row)
+            stats["neu" if old_hash is None else "geaendert"] += 1
+
+        if prune:
+            for expose_id in set(known) - current_ids:
+                remove_listing(conn, expose_id)
+                stats["entfernt"] += 1
+
+    conn.close()
+    return stats
+
+# ===========================================================================
+# QUERY API
+# ===========================================================================
+
+def make_snippet(text: str, stems: List[str], words: int = SNIPPET_WORDS) -> str:
+    """Textausschnitt um den ersten Treffer, Treffer in [eckigen Klammern]"""
+    tokens = WORD_RE.findall(text)
+
+    def matches(word):
+        return any(s.startswith(q) for s in tokenize(word) for q in stems)
+
+    hits = [i for i, w in enumerate(tokens) if matches(w)]
+    start = max(0, hits[0] - words // 3) if hits else 0
+    window = tokens[start:start + words]
+
+    snippet = " ".join(f"[{w}]" if matches(w) else w for w in window)
+    if start > 0:
+        snippet = "… " + snippet
+    if start + words < len(tokens):
+        snippet += " …"
+    return snippet
+
+def search(query: str, limit: int = 10, index_file: str = INDEX_FILE) -> List[dict]:
+    """
+    Suche im lokalen Index.
+    Gibt nach Relevanz sortierte Treffer zurück: [{expose_id, score, snippet}]
+    """
+    stems = list(dict.fromkeys(tokenize(query)))
+    if not stems:
+        return []
+
+    # Präfix-Suche fängt Flexionen ab (balkon* → Balkone, Balkonen)
+    match = " OR ".join(f'"{s}"*' for s in stems)
+
+    conn = connect(index_file)
+    rows = conn.execute(
+        "SELECT expose_id, field, text, bm25(passages) FROM passages "
+        "WHERE passages MATCH ? ORDER BY bm25(passages) LIMIT ?",
+        (match, limit * 20),
+    ).fetchall()
+    conn.close()
+
+    # Aggregiere Passagen pro Listing: bester Treffer + halbe Summe der restlichen
+    results: Dict[str, dict] = {}
+    for expose_id, field, text, rank in rows:
+        score = -rank * FIELD_WEIGHTS.get(field, 1.0)
+        hit = results.get(expose_id)
+        if hit is None:
+            results[expose_id] = {
+                "expose_id": expose_id,
+                "score": score,
+                "field": field,
+                "text": text,
+            }
+        elif score > hit["score"]:
+            hit["score"] = score + hit["score"] * 0.5
+            hit["field"], hit["text"] = field, text
+        else:
+            hit["score"] += score * 0.5
+
+    ranked = sorted(results.values(), key=lambda r: r["score"], reverse=True)[:limit]
+    return [
+        {
+            "expose_id": r["expose_id"],
+            "score": round(r["score"], 4),
+            "snippet": make_snippet(r["text"], stems),
+        }
+        for r in ranked
+    ]
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokaler Chatbot-Suchindex")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Index aus CSV (inkrementell) aktualisieren")
+    build.add_argument("--csv", default=CSV_FILE)
+
+    query = sub.add_parser("search", help="Index durchsuchen")
+    query.add_argument("query")
+    query.add_argument("--limit", type=int, default=10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        rows = load_rows(args.csv)
+        if not rows:
+            print(f"[ERROR] {args.csv} nicht gefunden oder leer!")
+            sys.exit(1)
+        stats = update_index(rows)
+        print(f"[INDEX] ✅ {INDEX_FILE}: {stats}")
+    else:
+        for hit in search(args.query, limit=args.limit):
+            print(f"{hit['expose_id']}  ({hit['score']})")
+            print(f"  {hit['snippet']}")
+
+if __name__ == "__main__":
+    main()
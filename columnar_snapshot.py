@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Spaltenbasierter Snapshot (memory-mapped) neben dem CSV
+
+Layout (Verzeichnis immoscout_snapshot/):
+  meta.json             Zeilenzahl, Spalten, Dictionaries, Quelle (CSV Größe/mtime)
+  <spalte>.off/.heap    Strings: uint64 Offsets (n+1) + UTF-8 Heap
+  <spalte>.codes        Kategorien: Dictionary-Codes (uint16/uint32)
+  <spalte>.f64          Zahlen (Preis, Fläche, ...): float64, NaN = leer
+
+Spalten werden erst beim ersten Zugriff gemappt; Filter wie
+status != "Vermarktet" sind Vergleiche auf den Codes statt Python-Loops
+über Dicts. Nur die gefilterten Zeilen (und nur angefragte Spalten)
+werden wieder zu Dicts - mit iter_snapshot_rows einzeln statt als Liste.
+
+Nutzung:
+  python3 columnar_snapshot.py build      # aus immoscout_mutzel.csv
+  python3 columnar_snapshot.py info
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from typing import List, Dict, Optional, Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError:
+    print("[ERROR] numpy nicht installiert:")
+    print("  pip3 install numpy --break-system-packages")
+    sys.exit(1)
+
+from snapshot import CSV_FILE, load_rows, parse_preis, parse_float
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+COLUMNAR_DIR = "immoscout_snapshot"
+
+FORMAT_VERSION = 2
+
+# Wenige verschiedene Werte → Dictionary-Encoding
+CATEGORY_COLUMNS = ("kategorie", "unterkategorie", "status", "plz", "ort", "region")
+
+# Zusätzlich als float64 für vektorisierte Bereichsfilter
+NUMERIC_COLUMNS = {
+    "preis": parse_preis,
+    "wohnflaeche": parse_float,
+    "zimmer": parse_float,
+    "lat": parse_float,
+    "lon": parse_float,
+}
+
+# ===========================================================================
+# SCHREIBEN
+# ===========================================================================
+
+def as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = "\n".join(value)
+    # Wie der CSV-Leser (load_rows, universal newlines): \r\n / \r → \n
+    return str(value).replace("\r\n", "\n").replace("\r", "\n")
+
+def write_array(path: str, array: np.ndarray):
+    # Atomar ersetzen: offene Memory-Maps behalten die alte Datei
+    tmp = path + ".tmp"
+    array.tofile(tmp)
+    os.replace(tmp, path)
+
+def source_stat(csv_file: str) -> Optional[dict]:
+    try:
+        st = os.stat(csv_file)
+    except FileNotFoundError:
+        return None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def write_columnar(rows: List[dict], out_dir: str = COLUMNAR_DIR, source: str = CSV_FILE) -> dict:
+    """Rows (wie im CSV) → spaltenbasierter Snapshot. Gibt meta zurück."""
+    os.makedirs(out_dir, exist_ok=True)
+    names = list(rows[0].keys()) if rows else []
+    columns = {}
+
+    for name in names:
+        values = [as_text(r.get(name)) for r in rows]
+
+        if name in CATEGORY_COLUMNS:
+            dictionary = sorted(set(values))
+            lookup = {v: i for i, v in enumerate(dictionary)}
+            dtype = np.uint16 if len(dictionary) < 2 ** 16 else np.uint32
+            write_array(os.path.join(out_dir, f"{name}.codes"),
+                        np.array([lookup[v] for v in values], dtype=dtype))
+            columns[name] = {"kind": "category", "dtype": np.dtype(dtype).name, "dictionary": dictionary}
+        else:
+            encoded = [v.encode("utf-8") for v in values]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            write_array(os.path.join(out_dir, f"{name}.off"), offsets)
+            write_array(os.path.join(out_dir, f"{name}.heap"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            columns[name] = {"kind": "string"}
+
+        if name in NUMERIC_COLUMNS:
+            parse = NUMERIC_COLUMNS[name]
+            numbers = [parse(v) for v in values]
+            write_array(os.path.join(out_dir, f"{name}.f64"),
+                        np.array([np.nan if n is None else n for n in numbers], dtype=np.float64))
+            columns[name]["numeric"] = True
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "rows": len(rows),
+        "order": names,
+        "columns": columns,
+        "source": source_stat(source),
+    }
+    meta_path = os.path.join(out_dir, "meta.json")
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    return meta
+
+# ===========================================================================
+# LESEN
+# ===========================================================================
+
+class StringColumn:
+    """Lazy String-Spalte: dekodiert nur angefragte Zeilen"""
+
+    def __init__(self, offsets: np.ndarray, heap: np.ndarray):
+        self.offsets = offsets
+        self.heap = heap
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.heap[start:end].tobytes().decode("utf-8")
+
+    def take(self, indices: Iterable[int]) -> List[str]:
+        return [self[int(i)] for i in indices]
+
+class ColumnarSnapshot:
+    def __init__(self, path: str = COLUMNAR_DIR):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self.names = self.meta["order"]
+        self._maps: Dict[str, np.ndarray] = {}
+
+    def _map(self, filename: str, dtype) -> np.ndarray:
+        if filename not in self._maps:
+            path = os.path.join(self.path, filename)
+            # np.memmap kann keine leeren Dateien mappen
+            if os.path.getsize(path) == 0:
+                self._maps[filename] = np.zeros(0, dtype=dtype)
+            else:
+                self._maps[filename] = np.memmap(path, dtype=dtype, mode="r")
+        return self._maps[filename]
+
+    def codes(self, name: str) -> np.ndarray:
+        col = self.meta["columns"][name]
+        return self._map(f"{name}.codes", np.dtype(col["dtype"]))
+
+    def dictionary(self, name: str) -> List[str]:
+        return self.meta["columns"][name]["dictionary"]
+
+    def strings(self, name: str) -> StringColumn:
+        return StringColumn(self._map(f"{name}.off", np.uint64), self._map(f"{name}.heap", np.uint8))
+
+    def numbers(self, name: str) -> np.ndarray:
+        """float64 Spalte (NaN = leer) für Preis, Fläche, Zimmer, lat/lon"""
+        return self._map(f"{name}.f64", np.float64)
+
+    def values(self, name: str, indices: Iterable[int]) -> List[str]:
+        col = self.meta["columns"][name]
+        if col["kind"] == "category":
+            dictionary = col["dictionary"]
+            codes = self.codes(name)
+            return [dictionary[codes[int(i)]] for i in indices]
+        return self.strings(name).take(indices)
+
+    # --- vektorisierte Filter --------------------------------------------
+
+    def eq(self, name: str, value: str) -> np.ndarray:
+        col = self.meta["columns"][name]
+        if col["kind"] == "category":
+            if value not in col["dictionary"]:
+                return np.zeros(self.rows, dtype=bool)
+            return self.codes(name) == col["dictionary"].index(value)
+
+        # String-Spalte: erst Länge vergleichen, dann nur Kandidaten dekodieren
+        column = self.strings(name)
+        encoded = value.encode("utf-8")
+        mask = np.diff(column.offsets.astype(np.int64)) == len(encoded)
+        for i in np.flatnonzero(mask):
+            mask[i] = column[i] == value
+        return mask
+
+    def ne(self, name: str, value: str) -> np.ndarray:
+        return ~self.eq(name, value)
+
+    def between(self, name: str, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        numbers = self.numbers(name)
+        mask = ~np.isnan(numbers)
+        if low is not None:
+            mask &= numbers >= low
+        if high is not None:
+            mask &= numbers <= high
+        return mask
+
+    # --- Materialisieren -------------------------------------------------
+
+    def to_rows(self, mask: Optional[np.ndarray] = None, columns: Optional[List[str]] = None) -> List[dict]:
+        """Zeilen als Dicts (wie csv.DictReader) - nur für Maske/Spalten"""
+        return list(self.iter_rows(mask, columns))
+
+    def iter_rows(self, mask: Optional[np.ndarray] = None, columns: Optional[List[str]] = None,
+                  batch: int = 1024) -> Iterator[dict]:
+        """Wie to_rows, aber blockweise dekodiert - nie alle Zeilen gleichzeitig als Dicts"""
+        indices = np.arange(self.rows) if mask is None else np.flatnonzero(mask)
+        names = [n for n in (columns or self.names) if n in self.meta["columns"]]
+        for start in range(0, len(indices), batch):
+            block = indices[start:start + batch]
+            data = {name: self.values(name, block) for name in names}
+            for j in range(len(block)):
+                yield {name: data[name][j] for name in names}
+
+def open_columnar(csv_file: str = CSV_FILE, path: str = COLUMNAR_DIR) -> Optional[ColumnarSnapshot]:
+    """Spalten-Snapshot, falls vorhanden und passend zum aktuellen CSV (sonst None)"""
+    try:
+        snap = ColumnarSnapshot(path)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if snap.meta.get("version") != FORMAT_VERSION or snap.meta.get("source") != source_stat(csv_file):
+        return None
+    return snap
+
+def iter_snapshot_rows(csv_file: str = CSV_FILE, active_only: bool = False,
+                       columns: Optional[List[str]] = None) -> Iterator[dict]:
+    """
+    Rows einzeln über den Spalten-Snapshot (wenn aktuell), sonst gestreamt
+    aus dem CSV. active_only filtert per Status-Maske, columns begrenzt die
+    dekodierten Spalten.
+    """
+    snap = open_columnar(csv_file)
+    if snap is not None:
+        yield from snap.iter_rows(snap.ne("status", "Vermarktet") if active_only else None, columns)
+        return
+
+    if not os.path.exists(csv_file):
+        return
+    # Wie load_rows: universal newlines (\r\n in Feldern → \n)
+    with open(csv_file, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if active_only and row.get("status", "") == "Vermarktet":
+                continue
+            yield {c: row[c] for c in columns if c in row} if columns else row
+
+def load_snapshot_rows(csv_file: str = CSV_FILE, active_only: bool = False,
+                       columns: Optional[List[str]] = None) -> List[dict]:
+    """Rows über den Spalten-Snapshot (wenn aktuell), sonst aus dem CSV"""
+    return list(iter_snapshot_rows(csv_file, active_only, columns))
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spaltenbasierter Snapshot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help=f"{COLUMNAR_DIR}/ aus {CSV_FILE} erzeugen")
+    sub.add_parser("info", help="Spalten & Größen anzeigen")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        rows = load_rows(CSV_FILE)
+        if not rows:
+            print(f"[ERROR] {CSV_FILE} nicht gefunden oder leer!")
+            sys.exit(1)
+        meta = write_columnar(rows)
+        print(f"[COLUMNAR] ✅ {COLUMNAR_DIR}/: {meta['rows']} Zeilen, {len(meta['columns'])} Spalten")
+        return
+
+    snap = open_columnar()
+    if snap is None:
+        print(f"[COLUMNAR] ⚠️ {COLUMNAR_DIR}/ fehlt oder ist älter als {CSV_FILE}")
+        sys.exit(1)
+
+    print(f"[COLUMNAR] {snap.rows} Zeilen")
+    for name in snap.names:
+        col = snap.meta["columns"][name]
+        size = sum(
+            os.path.getsize(os.path.join(snap.path, f))
+            for f in os.listdir(snap.path) if f.startswith(f"{name}.")
+        )
+        extra = f"{len(col['dictionary'])} Werte" if col["kind"] == "category" else ""
+        print(f"  {name:16} {col['kind']:9} {size:>12,} Bytes  {extra}")
+
+if __name__ == "__main__":
+    main()
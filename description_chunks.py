@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Chatbot-Chunks: Beschreibung abschnittsweise, stabile IDs, nur Änderungen
+
+Hauptbeschreibung und jeder TEXT_AREA-Abschnitt (Lage, Ausstattung, ...)
+werden an Absatz-/Satzgrenzen in Chunks zerlegt. Chunk-ID = Hash aus
+Objektnummer, Abschnitt und Text → unveränderter Text behält seine ID,
+auch wenn sich davor etwas verschiebt.
+
+Store: immoscout_chunks.db (SQLite). Pro Lauf werden nur neue, verschobene
+und entfernte Chunks ausgegeben:
+  chunks_changed.jsonl   {"run_id", "op": "upsert", ...} / {"run_id", "op": "move", "chunk_id", "position"}
+                         / {"run_id", "op": "delete", "chunk_id"}
+                         (angehängt nach erfolgreichem Push - Verbraucher merken sich die letzte run_id)
+  Airtable (optional)    Chunk-Tabelle AIRTABLE_TABLE_CHATBOT_CHUNKS
+
+Embedding-/Index-Jobs verarbeiten damit nur geänderten Text.
+
+Nutzung:
+  python3 description_chunks.py             # Snapshot → Store (+ Airtable)
+  python3 description_chunks.py --dry-run   # nur Änderungen zählen
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from typing import List, Dict, Tuple
+
+import sync_airtable_chatbot as chatbot
+from chatbot_search_index import split_passages
+from columnar_snapshot import load_snapshot_rows
+from snapshot import CSV_FILE
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+CHUNK_FILE = "immoscout_chunks.db"
+CHANGES_FILE = "chunks_changed.jsonl"
+
+# Ziel-Länge pro Chunk (Zeichen)
+CHUNK_LENGTH = 800
+
+MAIN_SECTION = "Objektbeschreibung"
+
+# Einzige Snapshot-Spalten, die das Chunking liest
+CHUNK_COLUMNS = ["expose_id", "abschnitte", "beschreibung"]
+
+# ===========================================================================
+# CHUNKING
+# ===========================================================================
+
+def listing_sections(row: dict) -> List[Tuple[str, str]]:
+    """(Abschnitt, Text) - aus 'abschnitte', sonst ganze Beschreibung"""
+    try:
+        sections = json.loads(row.get("abschnitte") or "[]")
+    except ValueError:
+        sections = []
+
+    if sections:
+        return [(s.get("titel") or MAIN_SECTION, s.get("text", "")) for s in sections]
+    if row.get("beschreibung"):
+        return [(MAIN_SECTION, row["beschreibung"])]
+    return []
+
+def chunk_id(expose_id: str, section: str, text: str, occurrence: int = 0) -> str:
+    payload = "\x1f".join([expose_id, section, text, str(occurrence)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+def listing_chunks(row: dict, size: int = CHUNK_LENGTH) -> List[dict]:
+    expose_id = str(row.get("expose_id", ""))
+    chunks = []
+    seen: Dict[str, int] = {}
+
+    for section, text in listing_sections(row):
+        for passage in split_passages(text, size):
+            # Gleicher Text zweimal im selben Abschnitt → eigene ID
+            key = f"{section}\x1f{passage}"
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+
+            chunks.append({
+                "chunk_id": chunk_id(expose_id, section, passage, occurrence),
+                "expose_id": expose_id,
+                "abschnitt": section,
+                "position": len(chunks),
+                "text": passage,
+            })
+
+    return chunks
+
+# ===========================================================================
+# STORE
+# ===========================================================================
+
+def connect(chunk_file: str = CHUNK_FILE) -> sqlite3.Connection:
+    conn = sqlite3.connect(chunk_file)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS chunks (
+            chunk_id TEXT PRIMARY KEY,
+            expose_id TEXT NOT NULL,
+            abschnitt TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            text TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS chunks_expose ON chunks(expose_id);
+    """)
+    return conn
+
+def diff_chunks(conn: sqlite3.Connection, rows: List[dict],
+                prune: bool = True) -> Tuple[List[dict], List[str], List[dict]]:
+    """(neue Chunks, entfernte IDs, verschobene Chunks) gegenüber dem Store"""
+    existing = {cid: (eid, pos) for cid, eid, pos in conn.execute(
+        "SELECT chunk_id, expose_id, position FROM chunks"
+    )}
+
+    desired = {}
+    for row in rows:
+        for chunk in listing_chunks(row):
+            desired[chunk["chunk_id"]] = chunk
+
+    listing_ids = {str(r.get("expose_id", "")) for r in rows}
+    added = [c for cid, c in desired.items() if cid not in existing]
+    moved = [c for cid, c in desired.items() if cid in existing and existing[cid][1] != c["position"]]
+    removed = [
+        cid for cid, (eid, _) in existing.items()
+        if cid not in desired and (prune or eid in listing_ids)
+    ]
+
+    return added, removed, moved
+
+def apply_diff(conn: sqlite3.Connection, added: List[dict], removed: List[str], moved: List[dict]):
+    with conn:
+        conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(cid,) for cid in removed])
+        conn.executemany(
+            "INSERT OR REPLACE INTO chunks VALUES (:chunk_id, :expose_id, :abschnitt, :position, :text)",
+            added,
+        )
+        conn.executemany(
+            "UPDATE chunks SET position = :position WHERE chunk_id = :chunk_id", moved
+        )
+
+def new_run_id() -> str:
+    """Sortierbar (UTC, Mikrosekunden) - Verbraucher vergleichen per String"""
+    ns = time.time_ns()
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime(ns // 10 ** 9)) + f".{ns // 1000 % 10 ** 6:06d}"
+
+def write_changes(added: List[dict], removed: List[str], moved: List[dict],
+                  changes_file: str = CHANGES_FILE) -> str:
+    """
+    Änderungen dieses Laufs ANHÄNGEN (run_id pro Zeile) - ein verpasster
+    Poll geht so nicht verloren. Gibt die run_id zurück ("" = nichts zu tun).
+    """
+    if not added and not removed and not moved:
+        return ""
+
+    run_id = new_run_id()
+    with open(changes_file, "a", encoding="utf-8") as f:
+        for chunk in added:
+            f.write(json.dumps({"run_id": run_id, "op": "upsert", **chunk}, ensure_ascii=False) + "\n")
+        for chunk in moved:
+            f.write(json.dumps({"run_id": run_id, "op": "move", "chunk_id": chunk["chunk_id"],
+                                "position": chunk["position"]}) + "\n")
+        for cid in removed:
+            f.write(json.dumps({"run_id": run_id, "op": "delete", "chunk_id": cid}) + "\n")
+    return run_id
+
+# ===========================================================================
+# AIRTABLE (optional)
+# ===========================================================================
+
+def chunk_record(chunk: dict) -> dict:
+    return {"fields": {
+        "Chunk ID": chunk["chunk_id"],
+        "Objektnummer": chunk["expose_id"],
+        "Abschnitt": chunk["abschnitt"],
+        "Position": chunk["position"],
+        "Text": chunk["text"],
+    }}
+
+def push_to_airtable(rows: List[dict]) -> bool:
+    """
+    Chunk-Tabelle auf den Soll-Stand bringen: fehlende Chunks anlegen,
+    verschobene (Position) patchen, überzählige löschen. Abgleich gegen den
+    Stand IN Airtable (nicht gegen den lokalen Store) - so heilen auch
+    abgebrochene Läufe.
+    """
+    table = chatbot.AIRTABLE_TABLE_CHUNKS
+    before = chatbot.failed_requests
+
+    desired = {c["chunk_id"]: c for row in rows for c in listing_chunks(row)}
+    existing = chatbot.get_all_records(fields=["Chunk ID", "Position"], table=table)
+    if chatbot.failed_requests != before:
+        return False
+
+    present = {r.get("fields", {}).get("Chunk ID"): r for r in existing}
+    to_create = [chunk_record(c) for cid, c in desired.items() if cid not in present]
+    to_update = [
+        {"id": present[cid]["id"], "fields": {"Position": c["position"]}}
+        for cid, c in desired.items()
+        if cid in present and present[cid].get("fields", {}).get("Position") != c["position"]
+    ]
+    to_delete = [{"id": r["id"]} for cid, r in present.items() if cid not in desired]
+
+    print(f"[CHUNKS] Airtable: {len(to_create)} neu, {len(to_update)} verschoben, {len(to_delete)} entfernt")
+    if to_create:
+        chatbot.create_records(to_create, table=table)
+    if to_update:
+        chatbot.update_records(to_update, table=table)
+    if to_delete:
+        chatbot.delete_all_records(to_delete, table=table)
+
+    return chatbot.failed_requests == before
+
+def airtable_configured() -> bool:
+    return bool(chatbot.AIRTABLE_TOKEN and chatbot.AIRTABLE_BASE and chatbot.AIRTABLE_TABLE_CHUNKS)
+
+# ===========================================================================
+# UPDATE
+# ===========================================================================
+
+def update_chunks(rows: List[dict], chunk_file: str = CHUNK_FILE,
+                  changes_file: str = CHANGES_FILE, push: bool = True,
+                  dry_run: bool = False) -> dict:
+    """
+    rows = aktive Listings (wie Chatbot-Tabelle). Store und changes_file
+    werden erst nach erfolgreichem Push übernommen - ein fehlgeschlagener
+    Lauf hängt nichts an, der nächste liefert dieselben Änderungen einmal.
+    """
+    conn = connect(chunk_file)
+    try:
+        added, removed, moved = diff_chunks(conn, rows)
+        total = sum(len(listing_chunks(r)) for r in rows)
+        stats = {
+            "neu": len(added),
+            "entfernt": len(removed),
+            "verschoben": len(moved),
+            "unveraendert": total - len(added),
+            "zeichen_neu": sum(len(c["text"]) for c in added),
+        }
+        if dry_run:
+            return stats
+
+        if push and airtable_configured() and not push_to_airtable(rows):
+            print("[CHUNKS] ⚠️ Airtable Push unvollständig - Store & Änderungen bleiben auf altem Stand")
+            stats["fehler"] = 1
+            return stats
+
+        apply_diff(conn, added, removed, moved)
+        run_id = write_changes(added, removed, moved, changes_file)
+        if run_id:
+            stats["run_id"] = run_id
+        return stats
+    finally:
+        conn.close()
+
+def active_rows(rows: List[dict]) -> List[dict]:
+    return [r for r in rows if r.get("status", "") != "Vermarktet"]
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chatbot Beschreibungs-Chunks")
+    parser.add_argument("--dry-run", action="store_true", help="Nur zählen, nichts schreiben")
+    parser.add_argument("--no-airtable", action="store_true", help="Nur lokaler Store")
+    args = parser.parse_args(argv)
+
+    rows = load_snapshot_rows(CSV_FILE, active_only=True, columns=CHUNK_COLUMNS)
+    if not rows:
+        print(f"[ERROR] {CSV_FILE} nicht gefunden oder leer!")
+        sys.exit(1)
+
+    stats = update_chunks(rows, push=not args.no_airtable, dry_run=args.dry_run)
+    print(f"[CHUNKS] ✅ {CHUNK_FILE}: {stats}")
+    if not args.dry_run:
+        print(f"[CHUNKS] Änderungen → {CHANGES_FILE}")
+    if stats.get("fehler"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
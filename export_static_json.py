@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Statischer JSON-Export für das Website-Plugin
+Vorgerenderte, geshardete & vorkomprimierte Dateien für CDN / Bucket
+
+Layout (EXPORT_DIR):
+  manifest.json                         logischer Name → gehashter Dateiname
+  index.<hash>.json                     kompakte Übersicht für Listen
+  kategorie/<kategorie>-<status>.<hash>.json
+  region/<region>.<hash>.json
+  expose/<expose_id>.<hash>.json        Detail pro Immobilie
+
+Jede Datei zusätzlich als .gz und .br. Dateinamen enthalten den Content-Hash,
+d.h. nur geänderte Shards werden neu geschrieben (und müssen hochgeladen werden).
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+from typing import List, Dict, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from snapshot import CSV_FILE, load_rows
+from plugin_read_api import to_api_record, summary
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+EXPORT_DIR = "export"
+
+# Liste der geschriebenen Dateien (für inkrementellen Upload)
+CHANGED_FILE = "export_changed.txt"
+
+HASH_LENGTH = 12
+
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+# ===========================================================================
+# SHARDS
+# ===========================================================================
+
+def slug(value: str) -> str:
+    value = value.lower().translate(UMLAUTS)
+    return re.sub(r"[^a-z0-9]+", "-", value).strip("-") or "unbekannt"
+
+def build_shards(rows: List[dict]) -> Dict[str, object]:
+    """Logischer Shard-Name (ohne Hash/Endung) → JSON-Inhalt"""
+    records = [to_api_record(r) for r in rows if r.get("expose_id")]
+    summaries = [summary(r) for r in records]
+
+    shards: Dict[str, object] = {"index": summaries}
+
+    for s in summaries:
+        name = f"kategorie/{slug(s['kategorie'])}-{slug(s['status'])}"
+        shards.setdefault(name, []).append(s)
+
+        name = f"region/{slug(s['region'])}"
+        shards.setdefault(name, []).append(s)
+
+    for r in records:
+        shards[f"expose/{slug(r['expose_id'])}"] = r
+
+    return shards
+
+# ===========================================================================
+# SCHREIBEN
+# ===========================================================================
+
+def write_file(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def write_shard(export_dir: str, name: str, body: bytes) -> Tuple[str, List[str]]:
+    """
+    Schreibe Shard + .gz/.br Varianten, soweit noch nicht vorhanden.
+    Fehlende Varianten bestehender Shards werden nachgezogen (z.B. .br,
+    sobald brotli installiert ist).
+    Gibt (gehashter Dateiname, neu geschriebene Pfade) zurück.
+    """
+    digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+    filename = f"{name}.{digest}.json"
+    path = os.path.join(export_dir, filename)
+
+    encoders = {
+        path: lambda: body,
+        # mtime=0 → identischer Inhalt ergibt identische .gz Datei
+        f"{path}.gz": lambda: gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli:
+        encoders[f"{path}.br"] = lambda: brotli.compress(body, quality=11)
+
+    missing = [p for p in encoders if not os.path.exists(p)]
+
+    # Unkomprimierte Datei zuletzt: ihre Existenz markiert den Shard als vollständig
+    for variant_path in sorted(missing, key=lambda p: p == path):
+        write_file(variant_path, encoders[variant_path]())
+
+    return filename, sorted(missing)
+
+def export(rows: List[dict], export_dir: str = EXPORT_DIR) -> List[str]:
+    """Exportiere alle Shards, gibt die neu geschriebenen Dateien zurück"""
+    if not brotli:
+        print("[EXPORT] ⚠️  brotli nicht installiert - nur .gz Varianten")
+        print("  pip3 install brotli --break-system-packages")
+
+    shards = build_shards(rows)
+    manifest = {"shards": {}}
+    changed = []
+
+    for name, content in sorted(shards.items()):
+        body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        filename, written = write_shard(export_dir, name, body)
+        manifest["shards"][name] = filename
+        changed.extend(written)
+
+    manifest_body = json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8")
+    manifest_path = os.path.join(export_dir, "manifest.json")
+
+    old_manifest = b""
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "rb") as f:
+            old_manifest = f.read()
+
+    if manifest_body != old_manifest:
+        write_file(manifest_path, manifest_body)
+        changed.append(manifest_path)
+
+    remove_stale(export_dir, set(manifest["shards"].values()))
+    return changed
+
+def remove_stale(export_dir: str, active: set):
+    """Lösche Shards, die nicht mehr im Manifest stehen"""
+    for root, _, files in os.walk(export_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            rel = os.path.relpath(path, export_dir).replace(os.sep, "/")
+            base = re.sub(r"\.(gz|br)$", "", rel)
+            if rel != "manifest.json" and base not in active:
+                os.remove(path)
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def run(csv_file: str = CSV_FILE) -> bool:
+    print("=" * 80)
+    print("STATIC JSON EXPORT (PLUGIN)")
+    print("=" * 80)
+
+    rows = load_rows(csv_file)
+    if not rows:
+        print(f"[ERROR] {csv_file} nicht gefunden oder leer!")
+        return False
+
+    changed = export(rows)
+
+    with open(CHANGED_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(changed))
+
+    print(f"\n[EXPORT] ✅ {EXPORT_DIR}/: {len(rows)} Immobilien")
+    print(f"[EXPORT] {len(changed)} Dateien geändert → {CHANGED_FILE}")
+    return True
+
+def main():
+    if not run():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
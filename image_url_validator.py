@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Bild-URL Validierung (HEAD-Checks mit Cache)
+
+Jede eindeutige Bild-URL (über alle Exposés, alle genutzten Größen) wird
+einmal per HEAD geprüft - parallel, aber rate-limited. Ergebnis (Status,
+Content-Length, Content-Type) landet mit TTL in image_url_cache.json.
+Tote URLs (404/410 oder wiederholt harte Fehler) werden vor dem CSV-Export
+aus 'bilder' & Media-Manifest entfernt, der Image-Upload überspringt sie
+ebenfalls. 2xx mit unerwartetem Content-Type wird nur gemeldet.
+
+Nutzung:
+  python3 image_url_validator.py          # Snapshot prüfen & berichten
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Set, Optional, Iterable
+
+try:
+    import requests
+except ImportError:
+    print("[ERROR] requests nicht installiert:")
+    print("  pip3 install requests --break-system-packages")
+    sys.exit(1)
+
+from media_manifest import CONSUMER_IMAGE_PROFILES, select_images, load_manifest, dump_manifest
+from snapshot import CSV_FILE, load_rows
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+CACHE_FILE = "image_url_cache.json"
+
+# Wie lange ein Check-Ergebnis gilt
+CACHE_TTL_HOURS = float(os.getenv("IMAGE_CHECK_TTL_HOURS", "72"))
+
+# Parallele Checks & max. Requests/Sekunde (höflich zum Bild-CDN)
+WORKERS = int(os.getenv("IMAGE_CHECK_WORKERS", "8"))
+RATE_LIMIT = float(os.getenv("IMAGE_CHECK_RATE", "10"))
+
+TIMEOUT = 10
+
+# Status, bei denen die URL sicher tot ist
+DEAD_STATUS = (404, 410)
+
+# Harte Fehler (Netzwerk = Status 0, 5xx) erst nach X Checks in Folge über
+# mindestens Y Stunden = tot (kurzer CDN-Ausfall im Watch-Modus reicht nicht)
+DEAD_AFTER_FAILURES = int(os.getenv("IMAGE_CHECK_DEAD_AFTER", "3"))
+DEAD_AFTER_HOURS = float(os.getenv("IMAGE_CHECK_DEAD_AFTER_HOURS", "24"))
+
+# Vorübergehende Antworten (Timeout, Rate Limit): sagen nichts über die URL,
+# gelten nie als frisch (nächster Lauf prüft erneut), zählen aber nicht als harter Fehler
+RETRY_STATUS = (408, 429)
+
+# ===========================================================================
+# CACHE
+# ===========================================================================
+
+def load_cache(cache_file: str = CACHE_FILE) -> Dict[str, dict]:
+    """url → {"status", "length", "type", "checked"}"""
+    if not os.path.exists(cache_file):
+        return {}
+    with open(cache_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_cache(cache: Dict[str, dict], keep_urls=None, cache_file: str = CACHE_FILE):
+    if keep_urls is not None:
+        keep_urls = set(keep_urls)
+        cache = {u: e for u, e in cache.items() if u in keep_urls}
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=0, sort_keys=True)
+
+def is_hard_failure(entry: dict) -> bool:
+    status = entry.get("status", 0)
+    return status == 0 or status >= 500
+
+def is_transient(entry: dict) -> bool:
+    return is_hard_failure(entry) or entry.get("status") in RETRY_STATUS
+
+def is_fresh(entry: Optional[dict], now: float) -> bool:
+    # Harte Fehler & Rate Limits jeden Lauf neu prüfen (harte zählen 'failures' hoch)
+    if not entry or is_transient(entry):
+        return False
+    return now - entry.get("checked", 0) < CACHE_TTL_HOURS * 3600
+
+def is_dead(entry: Optional[dict]) -> bool:
+    if not entry:
+        return False
+    if entry.get("status") in DEAD_STATUS:
+        return True
+    if not is_hard_failure(entry) or entry.get("failures", 0) < DEAD_AFTER_FAILURES:
+        return False
+    return entry.get("checked", 0) - entry.get("failing_since", entry.get("checked", 0)) >= DEAD_AFTER_HOURS * 3600
+
+def is_suspicious(entry: Optional[dict]) -> bool:
+    """2xx, aber kein image/* (z.B. HTML-Fehlerseite, octet-stream) - nur melden"""
+    if not entry:
+        return False
+    content_type = entry.get("type", "")
+    return 200 <= entry.get("status", 0) < 300 and bool(content_type) and not content_type.startswith("image/")
+
+# ===========================================================================
+# CHECKS
+# ===========================================================================
+
+class RateLimiter:
+    """Verteilt Requests aus mehreren Threads gleichmäßig (max. rate/Sekunde)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+def check_url(session: requests.Session, url: str) -> dict:
+    entry = {"status": 0, "length": None, "type": "", "checked": time.time()}
+    try:
+        response = session.head(url, timeout=TIMEOUT, allow_redirects=True)
+        # Manche CDNs erlauben kein HEAD → GET ohne Body zu laden
+        if response.status_code in (403, 405, 501):
+            response = session.get(url, timeout=TIMEOUT, stream=True)
+            response.close()
+    except requests.RequestException:
+        return entry
+
+    length = response.headers.get("Content-Length")
+    entry.update({
+        "status": response.status_code,
+        "length": int(length) if length and length.isdigit() else None,
+        "type": response.headers.get("Content-Type", "").split(";")[0].strip(),
+    })
+    return entry
+
+def validate_urls(urls: Iterable[str], cache: Dict[str, dict],
+                  workers: int = WORKERS, rate: float = RATE_LIMIT,
+                  session: Optional[requests.Session] = None) -> Dict[str, int]:
+    """Prüft alle URLs ohne frischen Cache-Eintrag (jede nur einmal). Aktualisiert cache."""
+    now = time.time()
+    urls = set(urls)
+    todo = sorted(u for u in urls if not is_fresh(cache.get(u), now))
+
+    if todo:
+        session = session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        limiter = RateLimiter(rate)
+
+        def task(url):
+            limiter.wait()
+            return url, check_url(session, url)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for url, entry in pool.map(task, todo):
+                # Harte Fehler in Folge zählen, jede echte Antwort setzt zurück
+                previous = cache.get(url) or {}
+                if is_hard_failure(entry):
+                    entry["failures"] = previous.get("failures", 0) + 1
+                    entry["failing_since"] = previous.get("failing_since", entry["checked"])
+                elif entry["status"] in RETRY_STATUS and "failures" in previous:
+                    # Rate Limit unterbricht eine Fehlerserie weder noch verlängert es sie
+                    entry["failures"] = previous["failures"]
+                    entry["failing_since"] = previous["failing_since"]
+                cache[url] = entry
+
+    dead = sum(1 for u in urls if is_dead(cache.get(u)))
+    suspicious = sum(1 for u in urls if is_suspicious(cache.get(u)))
+    return {"urls": len(urls), "geprueft": len(todo), "cache": len(urls) - len(todo),
+            "tot": dead, "verdaechtig": suspicious}
+
+# ===========================================================================
+# SNAPSHOT
+# ===========================================================================
+
+def split_bilder(value) -> List[str]:
+    if isinstance(value, list):
+        return value
+    return [b.strip() for b in (value or "").split("\n") if b.strip()]
+
+def image_urls(props: List[dict]) -> Set[str]:
+    """Alle URLs, die ein Verbraucher tatsächlich nutzt (+ 'bilder' Fallback)"""
+    urls = set()
+    for prop in props:
+        urls.update(split_bilder(prop.get("bilder")))
+        for consumer in CONSUMER_IMAGE_PROFILES:
+            urls.update(select_images(prop, consumer))
+    return urls
+
+def drop_dead(props: List[dict], cache: Dict[str, dict]) -> int:
+    """Tote URLs aus 'bilder' und Manifest entfernen. Gibt Anzahl entfernter Bilder zurück."""
+    removed = 0
+    for prop in props:
+        bilder = split_bilder(prop.get("bilder"))
+        alive = [b for b in bilder if not is_dead(cache.get(b))]
+        if len(alive) != len(bilder):
+            removed += len(bilder) - len(alive)
+            prop["bilder"] = alive if isinstance(prop.get("bilder"), list) else "\n".join(alive)
+
+        manifest = load_manifest(prop.get("medien"))
+        if not manifest:
+            continue
+        cleaned = []
+        for media in sorted(manifest, key=lambda m: m["pos"]):
+            urls = {k: u for k, u in media["urls"].items() if not is_dead(cache.get(u))}
+            if urls:
+                cleaned.append({**media, "pos": len(cleaned), "urls": urls})
+        if cleaned != manifest:
+            prop["medien"] = dump_manifest(cleaned)
+
+    return removed
+
+def validate_snapshot(props: List[dict], cache_file: str = CACHE_FILE) -> dict:
+    """Prüfen, tote Bilder entfernen, Cache speichern (nur aktuelle URLs)"""
+    cache = load_cache(cache_file)
+    urls = image_urls(props)
+    stats = validate_urls(urls, cache)
+    stats["entfernt"] = drop_dead(props, cache)
+    save_cache(cache, keep_urls=urls, cache_file=cache_file)
+    return stats
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bild-URL Validierung")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT, help="Requests/Sekunde (0 = unbegrenzt)")
+    args = parser.parse_args(argv)
+
+    rows = load_rows(CSV_FILE)
+    if not rows:
+        print(f"[ERROR] {CSV_FILE} nicht gefunden oder leer!")
+        sys.exit(1)
+
+    cache = load_cache()
+    urls = image_urls(rows)
+    stats = validate_urls(urls, cache, workers=args.workers, rate=args.rate)
+    save_cache(cache, keep_urls=urls)
+
+    print(f"[IMAGES] ✅ {stats}")
+    for row in rows:
+        urls = image_urls([row])
+        dead = [u for u in urls if is_dead(cache.get(u))]
+        suspicious = [u for u in urls if is_suspicious(cache.get(u))]
+        if dead or suspicious:
+            print(f"  {row['expose_id']}: {len(dead)} tote, {len(suspicious)} verdächtige URLs")
+            for url in (dead + suspicious)[:3]:
+                entry = cache[url]
+                print(f"    {entry['status']} {entry['type'] or '-'}  {url}")
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ import csv
 import json
 import time
 import random
+import argparse
 from typing import List, Dict, Optional
 
 try:
@@ -24,6 +25,16 @@ except ImportError:
     print("  pip3 install requests --break-system-packages")
     sys.exit(1)
 
+from profiling import Profiler, add_profile_argument
+from snapshot import CSV_FILE, load_rows, merge_details
+from refresh_scheduler import plan_refresh, load_state, save_state, mark_refreshed
+from chatbot_search_index import update_index, INDEX_FILE
+from similar_listings import build_index as build_similar_index, MODEL_FILE as SIMILAR_MODEL_FILE, TOP_K
+from plz_geo_index import annotate as annotate_geo, PLZ_FILE
+from media_manifest import build_manifest, dump_manifest
+from columnar_snapshot import write_columnar
+from image_url_validator import validate_snapshot as validate_images, CACHE_FILE as IMAGE_CACHE_FILE
+
 # ===========================================================================
 # KONFIGURATION
 # ===========================================================================
@@ -35,6 +46,12 @@ MOBILE_API = "https://api.mobile.immobilienscout24.de"
 REQUEST_DELAY = 2.0
 MAX_RETRIES = 3
 
+# HTTP Session (Keep-Alive; pipeline.py teilt eine Session über alle Stages)
+SESSION = requests.Session()
+
+# Fehlgeschlagene searchlistings Abfragen (Watch-Modus entfernt dann nichts)
+failed_listing_requests = 0
+
 # Airtable (optional)
 AIRTABLE_TOKEN = os.getenv("AIRTABLE_TOKEN", "")
 AIRTABLE_BASE_CHATBOT = os.getenv("AIRTABLE_BASE_CHATBOT", "")
@@ -66,7 +83,7 @@ def make_request(url: str, retries: int = MAX_RETRIES, mobile: bool = False) ->
     for attempt in range(retries):
         try:
             time.sleep(REQUEST_DELAY)
-            response = requests.get(url, headers=headers, timeout=30)
+            response = SESSION.get(url, headers=headers, timeout=30)
             
             if response.status_code == 200:
                 return response
@@ -82,6 +99,7 @@ def make_request(url: str, retries: int = MAX_RETRIES, mobile: bool = False) ->
 # ===========================================================================
 
 def get_listings_from_api(type_: str, real_estate_type: str) -> List[dict]:
+    global failed_listing_requests
     url = f"{API_BASE}/searchlistings"
     params = {
         "realtorEncryptedId": REALTOR_ID,
@@ -109,6 +127,8 @@ def get_listings_from_api(type_: str, real_estate_type: str) -> List[dict]:
         except:
             pass
     
+    print(f"  [ERROR] Listings konnten nicht geladen werden")
+    failed_listing_requests += 1
     return []
 
 def collect_all_listings():
@@ -180,7 +200,9 @@ def parse_listing(listing: dict) -> dict:
         "ort": ort,
         "region": region,
         "beschreibung": "",
+        "abschnitte": "",
         "bilder": [],
+        "medien": "",
         "ausstattung": "",
         "baujahr": "",
         "energieausweis": "",
@@ -210,6 +232,10 @@ def get_details_from_mobile_api(expose_id: str) -> dict:
         print(f"    [ERROR] JSON parse failed")
         return {}
     
+    return parse_expose_details(data)
+
+def parse_expose_details(data: dict) -> dict:
+    """Parse Exposé-JSON der Mobile API (Sections) → Detail-Felder"""
     details = {}
     
     # Titel
@@ -221,6 +247,7 @@ def get_details_from_mobile_api(expose_id: str) -> dict:
     
     # Beschreibung
     beschreibung_parts = []
+    abschnitte = []
     for section in data.get("sections", []):
         if section.get("type") == "TEXT_AREA":
             title = section.get("title", "")
@@ -230,27 +257,25 @@ def get_details_from_mobile_api(expose_id: str) -> dict:
             if text:
                 if title == "Objektbeschreibung":
                     beschreibung_parts.insert(0, text)  # Hauptbeschreibung zuerst
+                    abschnitte.insert(0, {"titel": title, "text": text})
                 else:
                     beschreibung_parts.append(f"\n\n{title}:\n{text}")
+                    abschnitte.append({"titel": title, "text": text})
     
     if beschreibung_parts:
         details["beschreibung"] = "".join(beschreibung_parts)
-        print(f"    📝 Beschreibung: {len(details['beschreibung'])} Zeichen")
+        # Abschnitte einzeln (für Chatbot-Chunks, description_chunks.py)
+        details["abschnitte"] = json.dumps(abschnitte, ensure_ascii=False, separators=(",", ":"))
+        print(f"    📝 Beschreibung: {len(details['beschreibung'])} Zeichen, {len(abschnitte)} Abschnitte")
     
-    # ALLE Bilder
-    bilder = []
-    for section in data.get("sections", []):
-        if section.get("type") == "MEDIA":
-            for media in section.get("media", []):
-                if media.get("type") == "PICTURE":
-                    # Nutze fullImageUrl für höchste Qualität
-                    img_url = media.get("fullImageUrl", "")
-                    if img_url and img_url not in bilder:
-                        bilder.append(img_url)
-    
-    if bilder:
-        details["bilder"] = bilder
-        print(f"    🖼️  {len(bilder)} Bilder")
+    # ALLE Bilder: Manifest mit allen Größen + Bildunterschriften
+    medien = build_manifest(data.get("sections", []))
+    
+    if medien:
+        # 'bilder' bleibt volle Qualität (Fallback für ältere Verbraucher)
+        details["bilder"] = [m["urls"].get("full") or next(iter(m["urls"].values())) for m in medien]
+        details["medien"] = dump_manifest(medien)
+        print(f"    🖼️  {len(medien)} Bilder ({', '.join(sorted(medien[0]['urls']))})")
     
     # Ausstattung & weitere Details
     attributes = []
@@ -283,6 +308,23 @@ def get_details_from_mobile_api(expose_id: str) -> dict:
 # EXPORT
 # ===========================================================================
 
+# Spalten des CSV-Snapshots (parse_listing + lat/lon aus annotate_geo)
+CSV_COLUMNS = [
+    "expose_id", "titel", "kategorie", "unterkategorie", "preis", "wohnflaeche", "zimmer",
+    "plz", "ort", "region", "beschreibung", "abschnitte", "bilder", "medien", "ausstattung",
+    "baujahr", "energieausweis", "status", "url", "lat", "lon",
+]
+
+def to_csv_row(prop: dict) -> dict:
+    """Listing in CSV-Form - so wie export_csv schreibt und die Sync-Skripte es zurücklesen"""
+    row = {}
+    for key, value in prop.items():
+        if isinstance(value, list):
+            row[key] = "\n".join(value)
+        else:
+            row[key] = "" if value is None else str(value)
+    return row
+
 def export_csv(properties: List[dict], filename: str = "immoscout_mutzel.csv"):
     """Export zu CSV"""
     if not properties:
@@ -293,14 +335,19 @@ def export_csv(properties: List[dict], filename: str = "immoscout_mutzel.csv"):
         if isinstance(p.get("bilder"), list):
             p["bilder"] = "\n".join(p["bilder"])
     
-    with open(filename, "w", newline="", encoding="utf-8") as f:
+    # Erst temporär schreiben, dann atomar ersetzen - Leser (Read API,
+    # Spalten-Snapshot) sehen nie ein halb geschriebenes CSV
+    tmp_file = filename + ".tmp"
+    with open(tmp_file, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(
             f, 
-            fieldnames=properties[0].keys(),
+            fieldnames=CSV_COLUMNS,  # Feste Spalten - ältere Rows ohne neue Spalten → leer
+            extrasaction="ignore",
             quoting=csv.QUOTE_MINIMAL  # Nur bei Bedarf quoten!
         )
         writer.writeheader()
         writer.writerows(properties)
+    os.replace(tmp_file, filename)
     
     print(f"[CSV] ✅ {filename}")
 
@@ -308,7 +355,7 @@ def export_csv(properties: List[dict], filename: str = "immoscout_mutzel.csv"):
 # MAIN
 # ===========================================================================
 
-def main():
+def run(profiler: Profiler):
     print("=" * 80)
     print("IMMOSCOUT24 FINAL SCRAPER - Mobile API (KEIN Captcha!)")
     print("=" * 80)
@@ -316,16 +363,24 @@ def main():
     
     # PHASE 1: API
     print("\n[PHASE 1] Sammle Listings von API...")
-    active, references = collect_all_listings()
+    with profiler.phase("1 Listings API"):
+        active, references = collect_all_listings()
     
     # PHASE 2: Parse
     print("\n[PHASE 2] Konvertiere Listings...")
-    active_props = [parse_listing(l) for l in active]
-    reference_props = [parse_listing(l) for l in references]
-    all_props = active_props + reference_props
+    with profiler.phase("2 Parse Listings"):
+        active_props = [parse_listing(l) for l in active]
+        reference_props = [parse_listing(l) for l in references]
+        all_props = active_props + reference_props
+        
+        # lat/lon aus gebündelter PLZ-Tabelle (offline, kein Geocoder)
+        located = annotate_geo(all_props)
     
     print(f"  Aktiv: {len(active_props)}")
-    print(f"  Referenzen: {len(reference_props)}\n")
+    print(f"  Referenzen: {len(reference_props)}")
+    if located < len(all_props):
+        print(f"  ⚠️ Geo: {len(all_props) - located} ohne Koordinaten ({PLZ_FILE})")
+    print()
     
     if not all_props:
         print("⚠️ Keine Immobilien gefunden!")
@@ -333,19 +388,48 @@ def main():
     
     # PHASE 3: Details via Mobile API
     print("[PHASE 3] Hole Details via Mobile API (KEIN Captcha!)...")
-    for i, prop in enumerate(all_props, 1):
-        print(f"\n[{i}/{len(all_props)}]")
-        details = get_details_from_mobile_api(prop["expose_id"])
-        prop.update(details)
+    with profiler.phase("3 Details Mobile API"):
+        # Tiered Refresh: neu > aktiv > Referenzen (langer TTL, verteilt)
+        previous = {r["expose_id"]: r for r in load_rows(CSV_FILE)}
+        state = load_state()
+        queue = plan_refresh(active_props, reference_props, previous, state)
+        print(f"  Refresh: {len(queue)} von {len(all_props)} (Rest aus letztem Snapshot)")
+        
+        # Nicht eingeplante Listings behalten ihre Details
+        for prop in all_props:
+            prop.update(merge_details(prop, previous.get(prop["expose_id"], {}), {}))
         
-        # Rate limiting (höflich bleiben)
-        if i < len(all_props):
-            wait = random.uniform(2, 4)
-            time.sleep(wait)
+        for i, prop in enumerate(queue, 1):
+            print(f"\n[{i}/{len(queue)}]")
+            details = get_details_from_mobile_api(prop["expose_id"])
+            prop.update(details)
+            if details:
+                mark_refreshed(state, prop["expose_id"])
+            
+            # Rate limiting (höflich bleiben)
+            if i < len(queue):
+                wait = random.uniform(2, 4)
+                time.sleep(wait)
+    
+    # PHASE 4: Bild-URLs prüfen (HEAD, je URL einmal, Cache mit TTL) & Export
+    print("\n[PHASE 4] Prüfe Bild-URLs...")
+    with profiler.phase("4 Bild-URLs"):
+        image_stats = validate_images(all_props)
+    print(f"[IMAGES] ✅ {IMAGE_CACHE_FILE}: {image_stats}")
     
-    # PHASE 4: Export
     print("\n[PHASE 4] Speichere CSV...")
-    export_csv(all_props)
+    with profiler.phase("4 Export CSV"):
+        export_csv(all_props)
+        write_columnar(all_props)
+        save_state(state, keep_ids=[p["expose_id"] for p in all_props])
+    
+    # PHASE 5: Lokale Indizes (Chatbot-Suche, ähnliche Immobilien)
+    print("\n[PHASE 5] Aktualisiere lokale Indizes...")
+    with profiler.phase("5 Lokale Indizes"):
+        stats = update_index(all_props)
+        print(f"[INDEX] ✅ {INDEX_FILE}: {stats}")
+        build_similar_index(all_props)
+        print(f"[SIMILAR] ✅ {SIMILAR_MODEL_FILE}: Top-{TOP_K} Nachbarn")
     
     # Summary
     print("\n" + "=" * 80)
@@ -369,5 +453,16 @@ def main():
         print(f"  Bilder: {bilder_count}")
         print(f"  Ausstattung: {p.get('ausstattung', '')[:80]}...")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ImmoScout24 Scraper (Mobile API)")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    
+    profiler = Profiler("scraper", args.profile)
+    try:
+        run(profiler)
+    finally:
+        profiler.write_summary()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Media-Manifest & Bildauswahl pro Verbraucher
+
+Die MEDIA-Section der Mobile API liefert pro Bild mehrere Größen
+(preview / web / full) plus Bildunterschrift. Das Manifest hält alle
+Varianten in Reihenfolge fest (Spalte 'medien', JSON) - jeder Verbraucher
+wählt daraus nur Größe & Anzahl, die er wirklich braucht.
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import json
+from typing import List, Dict
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+# Mobile API Feld → Variante (klein → groß)
+VARIANT_KEYS = {
+    "previewImageUrl": "preview",
+    "imageUrlForWeb": "web",
+    "fullImageUrl": "full",
+}
+SIZE_ORDER = ("preview", "web", "full")
+
+# Größe & Anzahl (0 = alle) pro Verbraucher
+CONSUMER_IMAGE_PROFILES = {
+    "chatbot": {"size": "preview", "count": 1},
+    "plugin_thumbnail": {"size": "preview", "count": 1},
+    "plugin_gallery": {"size": "web", "count": 0},
+    "airtable": {"size": "preview", "count": 10},
+}
+
+# ===========================================================================
+# MANIFEST
+# ===========================================================================
+
+def build_manifest(sections: List[dict]) -> List[dict]:
+    """MEDIA/PICTURE Einträge → [{"pos", "caption", "urls": {variante: url}}]"""
+    manifest = []
+    seen = set()
+    for section in sections:
+        if section.get("type") != "MEDIA":
+            continue
+        for media in section.get("media", []):
+            if media.get("type") != "PICTURE":
+                continue
+
+            urls = {}
+            for key, value in media.items():
+                if isinstance(value, str) and value.startswith("http"):
+                    urls[VARIANT_KEYS.get(key, key)] = value
+            if not urls:
+                continue
+
+            key = urls.get("full") or next(iter(urls.values()))
+            if key in seen:
+                continue
+            seen.add(key)
+
+            manifest.append({"pos": len(manifest), "caption": media.get("caption", ""), "urls": urls})
+
+    return manifest
+
+def dump_manifest(manifest: List[dict]) -> str:
+    return json.dumps(manifest, ensure_ascii=False, separators=(",", ":")) if manifest else ""
+
+def load_manifest(value) -> List[dict]:
+    if isinstance(value, list):
+        return value
+    try:
+        return json.loads(value) if value else []
+    except ValueError:
+        return []
+
+# ===========================================================================
+# AUSWAHL
+# ===========================================================================
+
+def pick_variant(urls: Dict[str, str], size: str) -> str:
+    """Gewünschte Größe, sonst nächstgrößere, sonst nächstkleinere"""
+    if size in urls:
+        return urls[size]
+
+    rank = SIZE_ORDER.index(size) if size in SIZE_ORDER else len(SIZE_ORDER)
+    for candidate in SIZE_ORDER[rank + 1:] + SIZE_ORDER[:rank][::-1]:
+        if candidate in urls:
+            return urls[candidate]
+    return next(iter(urls.values()), "")
+
+def select_images(row: dict, consumer: str) -> List[str]:
+    """Bild-URLs für einen Verbraucher (Fallback: 'bilder' Spalte in voller Größe)"""
+    profile = CONSUMER_IMAGE_PROFILES[consumer]
+    manifest = load_manifest(row.get("medien"))
+
+    if manifest:
+        urls = [pick_variant(m["urls"], profile["size"]) for m in sorted(manifest, key=lambda m: m["pos"])]
+    else:
+        bilder = row.get("bilder", "")
+        if isinstance(bilder, list):
+            bilder = "\n".join(bilder)
+        urls = [b.strip() for b in bilder.split("\n") if b.strip()]
+
+    urls = [u for u in urls if u]
+    return urls[:profile["count"]] if profile["count"] else urls
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Pipeline CLI: alle Stages in EINEM Prozess als Abhängigkeitsgraph
+
+  scrape ─→ normalize ─┬─→ sync-chatbot ─→ chunks
+                       ├─→ sync-plugin ─→ images
+                       └─→ export
+
+- Unabhängige Zweige laufen parallel (Thread-Pool)
+- Eine HTTP-Session für Scraper & Airtable-Syncs (Keep-Alive)
+- Eine Stage wird übersprungen, wenn der Hash ihrer Inputs dem letzten
+  erfolgreichen Lauf entspricht (pipeline_state.json)
+
+normalize lädt den Snapshot einmal und berechnet pro Stage den Hash genau
+der Daten, die sie konsumiert (Chatbot-Records, Plugin-Records, Bild-URLs,
+Beschreibungs-Abschnitte, CSV). Die Syncs löschen & erstellen Records -
+daher nur mit --yes bzw. AIRTABLE_AUTO_CONFIRM=true (keine Rückfragen aus
+parallelen Threads).
+
+Nutzung:
+  python3 pipeline.py --yes                       # kompletter Lauf
+  python3 pipeline.py --skip scrape --yes         # aus bestehendem CSV
+  python3 pipeline.py --only export
+  python3 pipeline.py --force sync-plugin --yes   # Hash ignorieren
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional, Callable
+
+try:
+    import requests
+except ImportError:
+    print("[ERROR] requests nicht installiert:")
+    print("  pip3 install requests --break-system-packages")
+    sys.exit(1)
+
+import immoscout_mobile_api_scraper as scraper
+import sync_airtable_chatbot as chatbot
+import sync_airtable_plugin as plugin
+import upload_images_to_airtable as uploader
+import export_static_json
+import description_chunks
+from media_manifest import select_images
+from profiling import Profiler, add_profile_argument
+from snapshot import CSV_FILE
+from columnar_snapshot import load_snapshot_rows, iter_snapshot_rows
+from watch_mode import airtable_configured
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+STATE_FILE = "pipeline_state.json"
+
+MAX_WORKERS = 3
+
+# Stage-Status, die abhängige Stages blockieren
+FAILED = ("fehlgeschlagen", "blockiert")
+
+# ===========================================================================
+# STAGES
+# ===========================================================================
+
+class Stage:
+    def __init__(self, name: str, deps: List[str], run: Callable[[dict], bool],
+                 input_hash: Optional[Callable[[dict], Optional[str]]] = None,
+                 unavailable: Optional[Callable[[dict], str]] = None,
+                 optional: bool = False):
+        self.name = name
+        self.deps = deps
+        self.run = run
+        # None → Stage läuft immer
+        self.input_hash = input_hash or (lambda ctx: None)
+        # Grund, warum die Stage nicht laufen kann ("" = verfügbar)
+        self.unavailable = unavailable or (lambda ctx: "")
+        # Fehler lassen den Pipeline-Lauf nicht fehlschlagen
+        self.optional = optional
+
+def digest(value) -> str:
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def stream_digest(header, items) -> str:
+    """Wie digest, aber inkrementell - items werden nie als Liste gehalten"""
+    h = hashlib.sha1(digest(header).encode("ascii"))
+    for item in items:
+        h.update(digest(item).encode("ascii"))
+    return h.hexdigest()
+
+def profiled(ctx: dict, script: str, func) -> bool:
+    profiler = Profiler(script, ctx["profile"])
+    try:
+        return func(profiler)
+    finally:
+        profiler.write_summary()
+
+def run_scrape(ctx: dict) -> bool:
+    profiled(ctx, "scraper", scraper.run)
+    return os.path.exists(CSV_FILE)
+
+def run_normalize(ctx: dict) -> bool:
+    """
+    Pro Stage genau die konsumierten Daten hashen. Über den Spalten-Snapshot:
+    aktiv = Status-Maske, nur benötigte Spalten, Zeilen einzeln dekodiert.
+    """
+    if not os.path.exists(CSV_FILE) or not next(iter_snapshot_rows(CSV_FILE, columns=["expose_id"]), None):
+        print(f"[ERROR] {CSV_FILE} nicht gefunden oder leer!")
+        return False
+
+    counts = {"alle": 0, "aktiv": 0}
+
+    def counted(rows, key):
+        for row in rows:
+            counts[key] += 1
+            yield row
+
+    # Record-Konverter loggen pro Zeile - hier nur die Hashes interessant
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        chatbot_hash = stream_digest(
+            [chatbot.AIRTABLE_BASE, chatbot.AIRTABLE_TABLE],
+            (chatbot.csv_to_airtable_record(r)
+             for r in counted(iter_snapshot_rows(CSV_FILE, active_only=True), "aktiv")),
+        )
+        plugin_hash = stream_digest(
+            [plugin.AIRTABLE_BASE, plugin.AIRTABLE_TABLE, ctx["staged"]],
+            (plugin.csv_to_airtable_plugin_record(r)
+             for r in counted(iter_snapshot_rows(CSV_FILE), "alle")),
+        )
+
+    images_hash = stream_digest("images", (
+        (r["expose_id"], select_images(r, "airtable"))
+        for r in iter_snapshot_rows(CSV_FILE, columns=["expose_id", "medien", "bilder"])
+    ))
+    chunks_hash = stream_digest(chatbot.AIRTABLE_TABLE_CHUNKS, (
+        (r["expose_id"], r.get("abschnitte", ""), r.get("beschreibung", ""))
+        for r in iter_snapshot_rows(CSV_FILE, active_only=True, columns=description_chunks.CHUNK_COLUMNS)
+    ))
+
+    with open(CSV_FILE, "rb") as f:
+        csv_hash = hashlib.sha1(f.read()).hexdigest()
+
+    ctx["digests"] = {
+        "sync-chatbot": chatbot_hash,
+        "sync-plugin": plugin_hash,
+        "images": images_hash,
+        "export": csv_hash,
+        "chunks": chunks_hash,
+    }
+    print(f"[NORMALIZE] ✅ {counts['alle']} Immobilien, {counts['aktiv']} aktiv")
+    return True
+
+def run_sync(module, script: str, **kwargs):
+    def run(ctx: dict) -> bool:
+        before = module.failed_requests
+        # run() → False: abgebrochen (z.B. MIN_ROW_RATIO) oder Verifikation fehlgeschlagen
+        ok = profiled(ctx, script, lambda profiler: module.run(profiler, **kwargs))
+        return ok is not False and module.failed_requests == before
+    return run
+
+def run_images(ctx: dict) -> bool:
+    return profiled(ctx, "upload_images", uploader.run)
+
+def run_export(ctx: dict) -> bool:
+    return export_static_json.run()
+
+def run_chunks(ctx: dict) -> bool:
+    # Chunks brauchen nur ID & Texte der aktiven Listings
+    rows = load_snapshot_rows(CSV_FILE, active_only=True, columns=description_chunks.CHUNK_COLUMNS)
+    stats = description_chunks.update_chunks(rows)
+    print(f"[CHUNKS] ✅ {description_chunks.CHUNK_FILE}: {stats}")
+    return not stats.get("fehler")
+
+def sync_hash(name: str):
+    return lambda ctx: ctx["digests"][name]
+
+def images_hash(ctx: dict) -> str:
+    # Plugin-Sync erstellt Records neu → Attachments danach immer neu hochladen
+    plugin_run = ctx["state"].get("sync-plugin", {}).get("ran_at")
+    return digest([ctx["digests"]["images"], plugin_run])
+
+def chunks_hash(ctx: dict) -> Optional[str]:
+    # Ohne Store (z.B. frischer Checkout) immer laufen
+    return ctx["digests"]["chunks"] if os.path.exists(description_chunks.CHUNK_FILE) else None
+
+def export_hash(ctx: dict) -> Optional[str]:
+    manifest = os.path.join(export_static_json.EXPORT_DIR, "manifest.json")
+    if not os.path.exists(manifest):
+        return None
+    # brotli neu installiert → einmal laufen, um .br Varianten nachzuziehen
+    return digest([ctx["digests"]["export"], bool(export_static_json.brotli)])
+
+def airtable_unavailable(module) -> Callable[[dict], str]:
+    def check(ctx: dict) -> str:
+        if not airtable_configured(module):
+            return "Airtable nicht konfiguriert"
+        if os.getenv("AIRTABLE_AUTO_CONFIRM", "false").lower() != "true":
+            return "braucht --yes (AIRTABLE_AUTO_CONFIRM=true)"
+        return ""
+    return check
+
+def build_stages(staged: bool = False) -> Dict[str, Stage]:
+    stages = [
+        Stage("scrape", [], run_scrape),
+        Stage("normalize", ["scrape"], run_normalize),
+        Stage("sync-chatbot", ["normalize"], run_sync(chatbot, "sync_chatbot"),
+              sync_hash("sync-chatbot"), airtable_unavailable(chatbot)),
+        # Nach dem Chatbot-Sync: gleiche Base (Rate Limit) & gleicher Fehlerzähler
+        Stage("chunks", ["normalize", "sync-chatbot"], run_chunks, chunks_hash),
+        Stage("sync-plugin", ["normalize"], run_sync(plugin, "sync_plugin", staged=staged),
+              sync_hash("sync-plugin"), airtable_unavailable(plugin)),
+        Stage("images", ["sync-plugin"], run_images, images_hash,
+              lambda ctx: "" if uploader.configured() else "Airtable nicht konfiguriert",
+              optional=True),
+        Stage("export", ["normalize"], run_export, export_hash),
+    ]
+    return {s.name: s for s in stages}
+
+# ===========================================================================
+# STATE
+# ===========================================================================
+
+def load_state(state_file: str = STATE_FILE) -> Dict[str, dict]:
+    """Stage → {"input": Hash, "ran_at": Zeitpunkt} des letzten erfolgreichen Laufs"""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state: Dict[str, dict], state_file: str = STATE_FILE):
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+# ===========================================================================
+# AUSFÜHRUNG
+# ===========================================================================
+
+def run_stage(stage: Stage, ctx: dict) -> str:
+    reason = stage.unavailable(ctx)
+    if reason:
+        print(f"\n[PIPELINE] ⏭️  {stage.name}: {reason}")
+        return "übersprungen"
+
+    key = stage.input_hash(ctx)
+    last = ctx["state"].get(stage.name, {})
+    if key and stage.name not in ctx["force"] and last.get("input") == key:
+        print(f"\n[PIPELINE] ⏭️  {stage.name}: Inputs unverändert")
+        return "unverändert"
+
+    print(f"\n[PIPELINE] ▶ {stage.name}")
+    try:
+        ok = stage.run(ctx)
+    except (Exception, SystemExit) as e:
+        print(f"[PIPELINE] [ERROR] {stage.name}: {e!r}")
+        ok = False
+
+    if not ok:
+        return "fehlgeschlagen"
+
+    with ctx["lock"]:
+        ctx["state"][stage.name] = {"input": key, "ran_at": time.time()}
+        save_state(ctx["state"])
+    return "ok"
+
+def execute(stages: Dict[str, Stage], selected: List[str], ctx: dict, workers: int) -> Dict[str, dict]:
+    """Stages in Abhängigkeits-Reihenfolge, unabhängige Zweige parallel"""
+    results: Dict[str, dict] = {
+        name: {"status": "deaktiviert", "seconds": 0.0} for name in stages if name not in selected
+    }
+    pending = [name for name in stages if name in selected]
+    running = {}
+
+    def timed(stage: Stage) -> dict:
+        start = time.perf_counter()
+        status = run_stage(stage, ctx)
+        return {"status": status, "seconds": time.perf_counter() - start}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = [results.get(d) for d in stages[name].deps]
+                if any(d and d["status"] in FAILED for d in deps):
+                    results[name] = {"status": "blockiert", "seconds": 0.0}
+                    pending.remove(name)
+                elif all(deps):
+                    running[pool.submit(timed, stages[name])] = name
+                    pending.remove(name)
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+
+    return results
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    stage_names = list(build_stages())
+
+    parser = argparse.ArgumentParser(description="ImmoScout24 Pipeline (Stage-Graph)")
+    parser.add_argument("--only", nargs="+", choices=stage_names, default=None,
+                        help="Nur diese Stages (normalize läuft immer)")
+    parser.add_argument("--skip", nargs="+", choices=stage_names, default=[])
+    parser.add_argument("--force", nargs="*", choices=stage_names, default=None,
+                        help="Input-Hash ignorieren (ohne Namen: alle Stages)")
+    parser.add_argument("--yes", action="store_true",
+                        help="Airtable-Syncs ohne Rückfrage (AIRTABLE_AUTO_CONFIRM=true)")
+    parser.add_argument("--staged", action="store_true", help="Plugin-Sync als Staged Rebuild")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+
+    if args.yes:
+        os.environ["AIRTABLE_AUTO_CONFIRM"] = "true"
+
+    # Eine Session für alle Stages
+    session = requests.Session()
+    scraper.SESSION = chatbot.SESSION = plugin.SESSION = session
+
+    stages = build_stages(staged=args.staged)
+    selected = [n for n in (args.only or stage_names) if n not in args.skip]
+    if "normalize" not in selected:
+        selected.append("normalize")
+
+    ctx = {
+        "state": load_state(),
+        "lock": threading.Lock(),
+        "profile": args.profile,
+        "staged": args.staged,
+        "force": set(stage_names if args.force == [] else args.force or []),
+        "digests": {},
+    }
+
+    # Profiling patcht time.sleep/tracemalloc global → dann sequenziell
+    workers = 1 if args.profile else max(1, args.workers)
+
+    print("=" * 80)
+    print(f"IMMOSCOUT24 PIPELINE - {len(selected)} Stages, {workers} Worker")
+    print("=" * 80)
+
+    results = execute(stages, selected, ctx, workers)
+
+    print("\n" + "=" * 80)
+    print("PIPELINE SUMMARY")
+    print("=" * 80)
+    for name in stage_names:
+        r = results[name]
+        print(f"  {name:14} {r['status']:20} {r['seconds']:>8.1f}s")
+    print("=" * 80)
+
+    failed = [n for n, r in results.items() if r["status"] in FAILED and not stages[n].optional]
+    if failed:
+        print(f"❌ Fehlgeschlagen: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Lokale Read-API für das Website-Plugin
+Liefert den gescrapten Snapshot direkt aus - ohne Airtable-Quota & Latenz
+
+Endpoints:
+  GET /listings                 Liste (Filter + Pagination)
+      ?kategorie=Kaufen&status=Verfügbar
+      &plz_min=90000&plz_max=90999
+      &preis_min=100000&preis_max=500000
+      &near=90402&km=20         (Umkreis um PLZ-Schwerpunkt; 503 ohne plz_centroids.csv)
+      &page=1&page_size=20
+  GET /listings/<expose_id>     Detail
+  GET /health                   Snapshot-Version & Anzahl
+
+In-Memory Index, Hot-Reload bei neuem Snapshot, ETag/304 Support.
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from snapshot import CSV_FILE, parse_preis, parse_float
+from plz_geo_index import GeoIndex, GeoTableMissing
+from media_manifest import select_images, load_manifest
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+HOST = os.getenv("READ_API_HOST", "0.0.0.0")
+PORT = int(os.getenv("READ_API_PORT", "8080"))
+
+# Wie oft auf einen neuen Snapshot geprüft wird (Sekunden)
+RELOAD_INTERVAL = 2.0
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Max. gecachte Antworten pro Snapshot-Version
+RESPONSE_CACHE_SIZE = 512
+
+# Felder, die nur im Detail-Endpoint ausgeliefert werden
+DETAIL_FIELDS = ("beschreibung", "ausstattung", "baujahr", "energieausweis", "medien")
+
+DEFAULT_RADIUS_KM = 20.0
+
+# ===========================================================================
+# SNAPSHOT → API FORMAT
+# ===========================================================================
+
+def to_api_record(row: dict) -> dict:
+    """CSV Row → API Record (Zahlen geparst, Bilder als Liste)"""
+    bilder = select_images(row, "plugin_gallery")
+    thumbnails = select_images(row, "plugin_thumbnail")
+
+    record = {
+        "expose_id": row.get("expose_id", ""),
+        "titel": row.get("titel", ""),
+        "kategorie": row.get("kategorie", ""),
+        "unterkategorie": row.get("unterkategorie", ""),
+        "preis": parse_preis(row.get("preis")),
+        "preis_text": row.get("preis", ""),
+        "wohnflaeche": parse_float(row.get("wohnflaeche")),
+        "zimmer": parse_float(row.get("zimmer")),
+        "plz": row.get("plz", ""),
+        "ort": row.get("ort", ""),
+        "region": row.get("region", ""),
+        "lat": parse_float(row.get("lat")),
+        "lon": parse_float(row.get("lon")),
+        "status": row.get("status", ""),
+        "url": row.get("url", ""),
+        "bild_url": thumbnails[0] if thumbnails else "",
+        "bilder": bilder,
+    }
+    for field in DETAIL_FIELDS:
+        record[field] = row.get(field, "")
+    record["medien"] = load_manifest(row.get("medien"))
+
+    return record
+
+def summary(record: dict) -> dict:
+    return {k: v for k, v in record.items() if k not in DETAIL_FIELDS and k != "bilder"}
+
+# ===========================================================================
+# IN-MEMORY INDEX
+# ===========================================================================
+
+class ListingIndex:
+    """Unveränderlicher Index über eine Snapshot-Version"""
+
+    def __init__(self, rows: List[dict], version: str):
+        self.version = version
+        self.records = [to_api_record(r) for r in rows if r.get("expose_id")]
+        self.by_id = {r["expose_id"]: r for r in self.records}
+        self.summaries = [summary(r) for r in self.records]
+        self.positions = {r["expose_id"]: i for i, r in enumerate(self.records)}
+        self.geo = GeoIndex(self.records)
+
+        # Positionen pro kategorie/status für schnelle Filter
+        self.by_field: Dict[Tuple[str, str], List[int]] = {}
+        for i, r in enumerate(self.records):
+            for field in ("kategorie", "status"):
+                self.by_field.setdefault((field, r[field]), []).append(i)
+
+    def filter(self, kategorie: str = "", status: str = "",
+               plz_min: str = "", plz_max: str = "",
+               preis_min: Optional[float] = None,
+               preis_max: Optional[float] = None,
+               near: str = "", km: float = DEFAULT_RADIUS_KM) -> List[int]:
+        positions = range(len(self.records))
+        if near:
+            # Umkreis: nach Distanz sortiert
+            positions = [self.positions[eid] for eid, _ in self.geo.near_plz(near, km)]
+        for field, value in (("kategorie", kategorie), ("status", status)):
+            if value:
+                subset = set(self.by_field.get((field, value), []))
+                positions = [i for i in positions if i in subset]
+
+        result = []
+        for i in positions:
+            r = self.records[i]
+            if plz_min and r["plz"].zfill(5) < plz_min.zfill(5):
+                continue
+            if plz_max and r["plz"].zfill(5) > plz_max.zfill(5):
+                continue
+            if preis_min is not None and (r["preis"] is None or r["preis"] < preis_min):
+                continue
+            if preis_max is not None and (r["preis"] is None or r["preis"] > preis_max):
+                continue
+            result.append(i)
+
+        return result
+
+class SnapshotStore:
+    """Hält den aktuellen Index und lädt ihn neu, sobald ein neuer Snapshot landet"""
+
+    def __init__(self, csv_file: str = CSV_FILE):
+        self.csv_file = csv_file
+        self.index = ListingIndex([], "leer")
+        self.stat = None
+        self.cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """Neu laden wenn sich die CSV geändert hat (mtime/Größe)"""
+        try:
+            st = os.stat(self.csv_file)
+        except FileNotFoundError:
+            return False
+
+        stat = (st.st_mtime_ns, st.st_size)
+        if stat == self.stat:
+            return False
+
+        # Einmal lesen: Version & Zeilen stammen sicher aus derselben Datei
+        # (export_csv ersetzt das CSV atomar per os.replace)
+        with open(self.csv_file, "rb") as f:
+            data = f.read()
+        version = hashlib.sha1(data).hexdigest()[:16]
+
+        if version != self.index.version:
+            rows = list(csv.DictReader(io.StringIO(data.decode("utf-8"), newline="")))
+            index = ListingIndex(rows, version)
+            with self.lock:
+                self.index = index
+                self.cache.clear()
+            print(f"[API] ✅ Snapshot {version} geladen: {len(index.records)} Immobilien")
+
+        self.stat = stat
+        return True
+
+    def watch(self, interval: float = RELOAD_INTERVAL):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"[API] [ERROR] Reload failed: {e}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def cached(self, key: str, build) -> Tuple[str, bytes]:
+        """(etag, body) aus dem Antwort-Cache oder neu rendern"""
+        with self.lock:
+            index = self.index
+            hit = self.cache.get(key)
+            if hit:
+                self.cache.move_to_end(key)
+                return hit
+
+        body = json.dumps(build(index), ensure_ascii=False).encode("utf-8")
+        etag = f'"{index.version}-{hashlib.sha1(body).hexdigest()[:12]}"'
+
+        with self.lock:
+            if index is self.index:
+                self.cache[key] = (etag, body)
+                if len(self.cache) > RESPONSE_CACHE_SIZE:
+                    self.cache.popitem(last=False)
+
+        return etag, body
+
+# ===========================================================================
+# HTTP
+# ===========================================================================
+
+class NotFound(Exception):
+    pass
+
+def first(params: dict, name: str, default: str = "") -> str:
+    return params.get(name, [default])[0].strip()
+
+def list_listings(index: ListingIndex, params: dict) -> dict:
+    try:
+        page = max(1, int(first(params, "page", "1")))
+        page_size = min(MAX_PAGE_SIZE, max(1, int(first(params, "page_size", str(DEFAULT_PAGE_SIZE)))))
+    except ValueError:
+        page, page_size = 1, DEFAULT_PAGE_SIZE
+
+    km = parse_float(first(params, "km"))
+
+    positions = index.filter(
+        kategorie=first(params, "kategorie"),
+        status=first(params, "status"),
+        plz_min=first(params, "plz_min"),
+        plz_max=first(params, "plz_max"),
+        preis_min=parse_preis(first(params, "preis_min")),
+        preis_max=parse_preis(first(params, "preis_max")),
+        near=first(params, "near"),
+        km=km if km is not None else DEFAULT_RADIUS_KM,
+    )
+    start = (page - 1) * page_size
+
+    return {
+        "total": len(positions),
+        "page": page,
+        "page_size": page_size,
+        "version": index.version,
+        "records": [index.summaries[i] for i in positions[start:start + page_size]],
+    }
+
+def get_listing(index: ListingIndex, expose_id: str) -> dict:
+    record = index.by_id.get(expose_id)
+    if record is None:
+        raise NotFound(expose_id)
+    return record
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """If-None-Match: kommagetrennte Liste ganzer Tags (W/ = schwach) oder *"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+def make_handler(store: SnapshotStore):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            params = parse_qs(url.query)
+            key = f"{url.path}?{'&'.join(sorted(url.query.split('&')))}"
+
+            try:
+                if parts == ["health"]:
+                    index = store.index
+                    self.send_json(200, json.dumps({
+                        "status": "ok",
+                        "version": index.version,
+                        "records": len(index.records),
+                    }).encode("utf-8"))
+                    return
+                if parts == ["listings"]:
+                    etag, body = store.cached(key, lambda index: list_listings(index, params))
+                elif len(parts) == 2 and parts[0] == "listings":
+                    etag, body = store.cached(key, lambda index: get_listing(index, parts[1]))
+                else:
+                    raise NotFound(url.path)
+            except NotFound:
+                self.send_json(404, json.dumps({"error": "NOT_FOUND"}).encode("utf-8"))
+                return
+            except GeoTableMissing as e:
+                # near/km ohne PLZ-Tabelle: Fehler statt leerer Trefferliste
+                self.send_json(503, json.dumps({
+                    "error": "GEO_UNAVAILABLE",
+                    "message": f"{e} fehlt - Umkreissuche nicht verfügbar",
+                }).encode("utf-8"))
+                return
+
+            if etag_matches(etag, self.headers.get("If-None-Match", "")):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                return
+
+            self.send_json(200, body, etag)
+
+        def send_json(self, status: int, body: bytes, etag: str = ""):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            # Clients sollen per ETag revalidieren
+            self.send_header("Cache-Control", "no-cache")
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main():
+    print("=" * 80)
+    print("PLUGIN READ API - Snapshot ohne Airtable")
+    print("=" * 80)
+
+    store = SnapshotStore()
+    store.watch()
+
+    server = ThreadingHTTPServer((HOST, PORT), make_handler(store))
+    print(f"\n[API] Läuft auf http://{HOST}:{PORT} (CSV: {CSV_FILE})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[API] Beendet")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+PLZ Geo-Index für Umkreis- & Regionssuche (offline)
+
+Gebündelte PLZ-Schwerpunkt-Tabelle (plz_centroids.csv: plz,lat,lon,ort) wird
+beim Scrapen als lat/lon an jedes Listing gehängt. Darauf: Grid-Index mit
+vektorisierter Umkreis- (Haversine) und Bounding-Box-Suche.
+
+Die Tabelle wird einmalig aus dem GeoNames Postleitzahlen-Export erzeugt
+(https://download.geonames.org/export/zip/DE.zip, CC BY 4.0 GeoNames.org)
+und danach mit den Daten committet (deterministisch: sortiert, feste Rundung):
+  python3 plz_geo_index.py import DE.txt
+
+Nutzung:
+  python3 plz_geo_index.py near 90402 --km 20
+  python3 plz_geo_index.py bbox 49.3 10.9 49.6 11.2
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import sys
+import csv
+import math
+import argparse
+from typing import List, Dict, Tuple, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    print("[ERROR] numpy nicht installiert:")
+    print("  pip3 install numpy --break-system-packages")
+    sys.exit(1)
+
+from snapshot import CSV_FILE, load_rows, parse_float
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+PLZ_FILE = "plz_centroids.csv"
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid-Zellgröße in Grad (~28 km Nord-Süd)
+CELL_DEG = 0.25
+
+# Deutschland hat ~8.200 PLZ - weniger heißt: Download/Export unvollständig
+MIN_PLZ_COUNT = 8000
+
+# ===========================================================================
+# PLZ-TABELLE
+# ===========================================================================
+
+_centroids: Optional[Dict[str, Tuple[float, float]]] = None
+
+class GeoTableMissing(Exception):
+    """PLZ-Tabelle fehlt - Umkreissuche nicht möglich (statt still leerem Ergebnis)"""
+
+def load_centroids(plz_file: str = PLZ_FILE) -> Dict[str, Tuple[float, float]]:
+    """plz → (lat, lon). Leeres Dict wenn die Tabelle fehlt (wird nicht gecacht)."""
+    global _centroids
+    if _centroids is not None and plz_file == PLZ_FILE:
+        return _centroids
+
+    centroids = {}
+    if os.path.exists(plz_file):
+        with open(plz_file, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                centroids[row["plz"]] = (float(row["lat"]), float(row["lon"]))
+    else:
+        # Laut statt still: ohne Tabelle keine lat/lon und kein near/km Filter
+        print(f"[GEO] ❌ {plz_file} fehlt - Listings ohne lat/lon, Umkreissuche nicht verfügbar!")
+        print(f"  python3 plz_geo_index.py import DE.txt   (GeoNames DE.zip)")
+
+    # Fehlende Tabelle nicht cachen - taucht sie später auf (import, Deploy),
+    # greift der nächste Aufruf sie ohne Neustart auf
+    if plz_file == PLZ_FILE and centroids:
+        _centroids = centroids
+    return centroids
+
+def import_geonames(source: str, plz_file: str = PLZ_FILE) -> int:
+    """
+    GeoNames DE.txt (tab-separiert) → plz_centroids.csv (Mittelwert pro PLZ).
+    Bricht mit GeoTableMissing ab, statt eine unvollständige Tabelle zu schreiben.
+    """
+    global _centroids
+    sums: Dict[str, list] = {}
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 11 or not cols[9] or not cols[10]:
+                continue
+            plz, ort, lat, lon = cols[1], cols[2], float(cols[9]), float(cols[10])
+            entry = sums.setdefault(plz, [0.0, 0.0, 0, ort])
+            entry[0] += lat
+            entry[1] += lon
+            entry[2] += 1
+
+    if len(sums) < MIN_PLZ_COUNT:
+        raise GeoTableMissing(f"{source}: nur {len(sums)} PLZ (erwartet >= {MIN_PLZ_COUNT})")
+
+    tmp_file = plz_file + ".tmp"
+    with open(tmp_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["plz", "lat", "lon", "ort"])
+        for plz in sorted(sums):
+            lat_sum, lon_sum, n, ort = sums[plz]
+            writer.writerow([plz, f"{lat_sum / n:.5f}", f"{lon_sum / n:.5f}", ort])
+    os.replace(tmp_file, plz_file)
+
+    if plz_file == PLZ_FILE:
+        _centroids = None
+    return len(sums)
+
+def annotate(props: List[dict]) -> int:
+    """Hänge lat/lon (aus PLZ) an jedes Listing. Gibt Anzahl Treffer zurück."""
+    centroids = load_centroids()
+    found = 0
+    for prop in props:
+        coords = centroids.get(str(prop.get("plz", "")).strip())
+        if coords:
+            prop["lat"], prop["lon"] = f"{coords[0]:.5f}", f"{coords[1]:.5f}"
+            found += 1
+        else:
+            prop["lat"], prop["lon"] = "", ""
+    return found
+
+# ===========================================================================
+# GEO-INDEX
+# ===========================================================================
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vektorisierte Großkreis-Distanz (Grad → km)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class GeoIndex:
+    """Grid-Index über Listings mit lat/lon"""
+
+    def __init__(self, rows: List[dict], cell_deg: float = CELL_DEG):
+        located = [
+            (str(r.get("expose_id", "")), parse_float(r.get("lat")), parse_float(r.get("lon")))
+            for r in rows
+        ]
+        located = [(eid, lat, lon) for eid, lat, lon in located if lat is not None and lon is not None]
+
+        self.cell_deg = cell_deg
+        self.ids = np.array([eid for eid, _, _ in located])
+        self.lat = np.array([lat for _, lat, _ in located], dtype=np.float64)
+        self.lon = np.array([lon for _, _, lon in located], dtype=np.float64)
+
+        cells = np.floor(np.stack([self.lat, self.lon], axis=1) / cell_deg).astype(np.int64) \
+            if len(located) else np.zeros((0, 2), dtype=np.int64)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+        if len(located):
+            order = np.lexsort((cells[:, 1], cells[:, 0]))
+            keys, starts = np.unique(cells[order], axis=0, return_index=True)
+            bounds = list(starts[1:]) + [len(order)]
+            for key, start, end in zip(keys, starts, bounds):
+                self.cells[(int(key[0]), int(key[1]))] = order[start:end]
+
+    def candidates(self, min_lat, min_lon, max_lat, max_lon) -> np.ndarray:
+        c = self.cell_deg
+        parts = [
+            self.cells[(i, j)]
+            for i in range(math.floor(min_lat / c), math.floor(max_lat / c) + 1)
+            for j in range(math.floor(min_lon / c), math.floor(max_lon / c) + 1)
+            if (i, j) in self.cells
+        ]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[str]:
+        """Alle expose_ids innerhalb der Bounding-Box"""
+        idx = self.candidates(min_lat, min_lon, max_lat, max_lon)
+        mask = (
+            (self.lat[idx] >= min_lat) & (self.lat[idx] <= max_lat)
+            & (self.lon[idx] >= min_lon) & (self.lon[idx] <= max_lon)
+        )
+        return self.ids[idx[mask]].tolist()
+
+    def radius(self, lat: float, lon: float, km: float) -> List[Tuple[str, float]]:
+        """(expose_id, Distanz km) im Umkreis, nach Distanz sortiert"""
+        dlat = km / 111.0
+        dlon = km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        idx = self.candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        if not idx.size:
+            return []
+
+        dist = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        inside = dist <= km
+        idx, dist = idx[inside], dist[inside]
+        order = np.argsort(dist)
+        return [(str(self.ids[i]), round(float(d), 2)) for i, d in zip(idx[order], dist[order])]
+
+    def near_plz(self, plz: str, km: float) -> List[Tuple[str, float]]:
+        """Umkreissuche um den Schwerpunkt einer PLZ (GeoTableMissing ohne Tabelle)"""
+        centroids = load_centroids()
+        if not centroids:
+            raise GeoTableMissing(PLZ_FILE)
+        coords = centroids.get(plz)
+        if not coords:
+            return []
+        return self.radius(coords[0], coords[1], km)
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PLZ Geo-Index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="GeoNames DE.txt → plz_centroids.csv")
+    imp.add_argument("source")
+
+    near = sub.add_parser("near", help="Umkreissuche um eine PLZ")
+    near.add_argument("plz")
+    near.add_argument("--km", type=float, default=20.0)
+
+    box = sub.add_parser("bbox", help="Bounding-Box Suche")
+    for name in ("min_lat", "min_lon", "max_lat", "max_lon"):
+        box.add_argument(name, type=float)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        try:
+            count = import_geonames(args.source)
+        except GeoTableMissing as e:
+            print(f"[GEO] ❌ {e} - {PLZ_FILE} nicht geschrieben")
+            sys.exit(1)
+        print(f"[GEO] ✅ {PLZ_FILE}: {count} PLZ")
+        return
+
+    if not load_centroids():
+        print(f"[ERROR] {PLZ_FILE} fehlt - erst 'import' ausführen")
+        sys.exit(1)
+
+    index = GeoIndex(load_rows(CSV_FILE))
+    if args.command == "near":
+        for expose_id, km in index.near_plz(args.plz, args.km):
+            print(f"{expose_id}  {km:.1f} km")
+    else:
+        for expose_id in index.bbox(args.min_lat, args.min_lon, args.max_lat, args.max_lon):
+            print(expose_id)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Profiling-Modus für Scraper, Sync-Skripte & Image-Upload
+Pro Phase: cProfile Hotspots + tracemalloc Peak/Allokationen + Sleep-Anteil
+
+Aktivierung über --profile [DIR] im jeweiligen Skript. Ohne --profile ist
+Profiler.phase() ein No-Op.
+
+Reports (DIR, Standard: profiles/):
+  <skript>-<nr>-<phase>.txt   Hotspots (cumulative & tottime), Allokationsstellen
+  <skript>-summary.txt        Übersicht: Wall / Sleep / Arbeit / Peak pro Phase
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import io
+import os
+import re
+import time
+import pstats
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional, List
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+PROFILE_DIR = "profiles"
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+
+# ===========================================================================
+# SLEEP-ZÄHLER
+# ===========================================================================
+
+class SleepCounter:
+    """Ersetzt time.sleep und summiert die Zeit in Rate-Limiting Pausen"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.calls = 0
+        self._original = None
+
+    def install(self):
+        self._original = time.sleep
+        original = self._original
+
+        def counting_sleep(seconds):
+            start = time.perf_counter()
+            try:
+                original(seconds)
+            finally:
+                self.total += time.perf_counter() - start
+                self.calls += 1
+
+        time.sleep = counting_sleep
+
+    def uninstall(self):
+        if self._original is not None:
+            time.sleep = self._original
+            self._original = None
+
+# ===========================================================================
+# PROFILER
+# ===========================================================================
+
+def add_profile_argument(parser):
+    """--profile [DIR] zu einem argparse Parser hinzufügen"""
+    parser.add_argument(
+        "--profile", nargs="?", const=PROFILE_DIR, default=None, metavar="DIR",
+        help=f"cProfile/tracemalloc Reports pro Phase schreiben (Standard: {PROFILE_DIR}/)",
+    )
+
+class Profiler:
+    def __init__(self, script: str, profile_dir: Optional[str] = None):
+        self.script = script
+        self.profile_dir = profile_dir
+        self.enabled = profile_dir is not None
+        self.phases: List[dict] = []
+
+        if self.enabled:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        sleeps = SleepCounter()
+        profile = cProfile.Profile()
+
+        sleeps.install()
+        tracemalloc.start()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            sleeps.uninstall()
+
+            stats = {
+                "name": name,
+                "wall": wall,
+                "sleep": sleeps.total,
+                "sleep_calls": sleeps.calls,
+                "work": max(0.0, wall - sleeps.total),
+                "peak_kib": peak / 1024,
+            }
+            self.phases.append(stats)
+            self.write_phase_report(stats, profile, snapshot)
+
+    def write_phase_report(self, stats: dict, profile: cProfile.Profile,
+                           snapshot: tracemalloc.Snapshot):
+        slug = re.sub(r"[^a-z0-9]+", "-", stats["name"].lower()).strip("-")
+        path = os.path.join(self.profile_dir, f"{self.script}-{len(self.phases):02d}-{slug}.txt")
+
+        out = io.StringIO()
+        out.write(f"PHASE: {stats['name']}\n")
+        out.write(f"Wall:   {stats['wall']:.3f}s\n")
+        out.write(f"Sleep:  {stats['sleep']:.3f}s ({stats['sleep_calls']} Aufrufe, Rate Limiting)\n")
+        out.write(f"Arbeit: {stats['work']:.3f}s\n")
+        out.write(f"Peak:   {stats['peak_kib']:,.0f} KiB\n")
+
+        for sort in ("cumulative", "tottime"):
+            out.write(f"\n{'=' * 80}\nHOTSPOTS (sortiert nach {sort})\n{'=' * 80}\n")
+            pstats.Stats(profile, stream=out).sort_stats(sort).print_stats(TOP_FUNCTIONS)
+
+        out.write(f"\n{'=' * 80}\nALLOKATIONEN (Top {TOP_ALLOCATIONS} Stellen)\n{'=' * 80}\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            out.write(f"{stat}\n")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+
+    def write_summary(self):
+        if not self.enabled:
+            return
+
+        lines = [f"{'Phase':32} {'Wall':>9} {'Sleep':>9} {'Arbeit':>9} {'Peak KiB':>12}"]
+        for p in self.phases:
+            lines.append(
+                f"{p['name'][:32]:32} {p['wall']:>8.2f}s {p['sleep']:>8.2f}s "
+                f"{p['work']:>8.2f}s {p['peak_kib']:>12,.0f}"
+            )
+        summary = "\n".join(lines)
+
+        path = os.path.join(self.profile_dir, f"{self.script}-summary.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(summary + "\n")
+
+        print(f"\n[PROFILE] {path}")
+        print(summary)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tiered Refresh Scheduler für Phase 3 (Details via Mobile API)
+
+Tiers (Reihenfolge in der Queue):
+  NEU AKTIV  Aktive Listings ohne Details im letzten Snapshot
+  AKTIV      Jeder Lauf (was Kunden sehen), ältester Refresh zuerst
+  NEU REF    Referenzen ohne Details
+  REFERENZ   Langer TTL, gleichmäßig über die Läufe verteilt (Round-Robin)
+
+Optional begrenzt ein Request-Budget die Detail-Requests pro Lauf.
+Nicht geholte Listings übernehmen ihre Details aus dem letzten Snapshot.
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import json
+import math
+import time
+from typing import List, Dict, Optional
+
+from snapshot import DETAIL_FIELDS
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+STATE_FILE = "refresh_state.json"
+
+# Abstand zwischen zwei regulären Läufen (Workflow: 06:00 & 18:00 UTC)
+RUN_INTERVAL_HOURS = float(os.getenv("SCRAPER_RUN_INTERVAL_HOURS", "12"))
+
+TIER_POLICIES = {
+    "active": {"ttl_hours": 0},
+    "reference": {"ttl_hours": float(os.getenv("SCRAPER_REFERENCE_TTL_HOURS", str(7 * 24)))},
+}
+
+# Max. Detail-Requests pro Lauf (0 = unbegrenzt)
+REQUEST_BUDGET = int(os.getenv("SCRAPER_REQUEST_BUDGET") or "0")
+
+# ===========================================================================
+# STATE
+# ===========================================================================
+
+def load_state(state_file: str = STATE_FILE) -> Dict[str, float]:
+    """expose_id → Zeitpunkt des letzten erfolgreichen Detail-Refresh"""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state: Dict[str, float], keep_ids=None, state_file: str = STATE_FILE):
+    if keep_ids is not None:
+        keep_ids = set(keep_ids)
+        state = {k: v for k, v in state.items() if k in keep_ids}
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+def mark_refreshed(state: Dict[str, float], expose_id: str, now: Optional[float] = None):
+    state[expose_id] = now if now is not None else time.time()
+
+# ===========================================================================
+# PLANUNG
+# ===========================================================================
+
+def has_details(row: Optional[dict]) -> bool:
+    return bool(row) and any(row.get(f) for f in DETAIL_FIELDS)
+
+def reference_quota(count: int, ttl_hours: float) -> int:
+    """Referenzen pro Lauf, damit jede ca. alle ttl_hours einmal dran ist"""
+    if ttl_hours <= 0:
+        return count
+    runs_per_ttl = max(1.0, ttl_hours / RUN_INTERVAL_HOURS)
+    return math.ceil(count / runs_per_ttl)
+
+def plan_refresh(active_props: List[dict], reference_props: List[dict],
+                 previous: Dict[str, dict], state: Dict[str, float],
+                 budget: int = REQUEST_BUDGET, now: Optional[float] = None) -> List[dict]:
+    """
+    Reihenfolge der Detail-Requests für diesen Lauf.
+    previous = expose_id → Row aus dem letzten Snapshot
+    """
+    now = now if now is not None else time.time()
+
+    def last(p):
+        return state.get(p["expose_id"], 0.0)
+
+    new_active = [p for p in active_props if not has_details(previous.get(p["expose_id"]))]
+    new_refs = [p for p in reference_props if not has_details(previous.get(p["expose_id"]))]
+
+    known_active = sorted(
+        (p for p in active_props if has_details(previous.get(p["expose_id"]))), key=last
+    )
+    active_ttl = TIER_POLICIES["active"]["ttl_hours"] * 3600
+    known_active = [p for p in known_active if now - last(p) >= active_ttl]
+
+    # Referenzen: ältester Refresh zuerst, nicht öfter als halber TTL,
+    # max. Quote pro Lauf → Last verteilt sich gleichmäßig
+    ref_ttl_hours = TIER_POLICIES["reference"]["ttl_hours"]
+    known_refs = sorted(
+        (p for p in reference_props if has_details(previous.get(p["expose_id"]))), key=last
+    )
+    due_refs = [p for p in known_refs if now - last(p) >= ref_ttl_hours * 3600 / 2]
+    due_refs = due_refs[:reference_quota(len(known_refs), ref_ttl_hours)]
+
+    # Bei Budget zuerst alles, was Kunden sehen (aktiv) - neue Referenzen
+    # dürfen fällige aktive Listings nicht verdrängen
+    queue = new_active + known_active + new_refs + due_refs
+    if budget > 0:
+        queue = queue[:budget]
+
+    return queue
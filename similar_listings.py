@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+"Ähnliche Immobilien" Index
+NumPy Feature-Matrix aus Preis, Fläche, Zimmer, Kategorie, Typ & Lage
+
+Beim Scrapen werden pro expose_id die k nächsten Nachbarn vorberechnet und
+neben dem Snapshot gespeichert. Ad-hoc Suchkriterien lassen sich gebündelt
+gegen das gespeicherte Modell abfragen.
+
+Nutzung:
+  python3 similar_listings.py build
+  python3 similar_listings.py query --preis 350000 --wohnflaeche 90 --zimmer 3 --kategorie Kaufen
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import sys
+import json
+import argparse
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("[ERROR] numpy nicht installiert:")
+    print("  pip3 install numpy --break-system-packages")
+    sys.exit(1)
+
+from snapshot import CSV_FILE, load_rows, parse_preis, parse_float
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+MODEL_FILE = "immoscout_similar.npz"
+NEIGHBOURS_FILE = "immoscout_similar.json"
+
+TOP_K = 10
+
+# Gewichtung der Feature-Gruppen (größer = wichtiger für Ähnlichkeit)
+FEATURE_WEIGHTS = {
+    "preis": 1.5,
+    "wohnflaeche": 1.0,
+    "zimmer": 0.7,
+    "kategorie": 4.0,       # Kaufen vs. Mieten nie mischen
+    "unterkategorie": 1.5,
+    "plz_zone": 1.0,        # Erste 2 Ziffern der PLZ
+    "region": 0.7,
+}
+
+# Numerische Features (log = log1p vor Standardisierung)
+NUMERIC_FEATURES = (
+    ("preis", parse_preis, True),
+    ("wohnflaeche", parse_float, True),
+    ("zimmer", parse_float, False),
+)
+
+CATEGORICAL_FEATURES = ("kategorie", "unterkategorie", "plz_zone", "region")
+
+# Max. Elemente pro Distanz-Block (hält RAM bei 50k+ Listings konstant)
+BLOCK_ELEMENTS = 1 << 24
+
+# ===========================================================================
+# FEATURES
+# ===========================================================================
+
+def categorical_value(row: dict, feature: str) -> str:
+    if feature == "plz_zone":
+        return str(row.get("plz", ""))[:2]
+    return str(row.get(feature, "") or "")
+
+def numeric_column(rows: List[dict], feature: str, parser, log: bool) -> np.ndarray:
+    values = np.array(
+        [parser(row.get(feature)) if row.get(feature) not in (None, "") else np.nan for row in rows],
+        dtype=np.float64,
+    )
+    return np.log1p(values) if log else values
+
+def fit_encoder(rows: List[dict]) -> dict:
+    """Normalisierung (Mittelwert/Std) und Kategorien-Vokabular lernen"""
+    encoder = {"numeric": {}, "categorical": {}}
+
+    for feature, parser, log in NUMERIC_FEATURES:
+        column = numeric_column(rows, feature, parser, log)
+        finite = column[np.isfinite(column)]
+        mean = float(finite.mean()) if finite.size else 0.0
+        std = float(finite.std()) if finite.size else 1.0
+        encoder["numeric"][feature] = {"mean": mean, "std": std or 1.0}
+
+    for feature in CATEGORICAL_FEATURES:
+        vocab = sorted({categorical_value(row, feature) for row in rows} - {""})
+        encoder["categorical"][feature] = vocab
+
+    return encoder
+
+def encode(rows: List[dict], encoder: dict) -> np.ndarray:
+    """Listings/Kriterien → gewichtete, normalisierte Feature-Matrix (float32)"""
+    blocks = []
+
+    for feature, parser, log in NUMERIC_FEATURES:
+        stats = encoder["numeric"][feature]
+        column = (numeric_column(rows, feature, parser, log) - stats["mean"]) / stats["std"]
+        # Fehlende Werte = Mittelwert (Build); Ad-hoc Abfragen maskieren sie
+        column = np.nan_to_num(column, nan=0.0, posinf=0.0, neginf=0.0)
+        blocks.append((column * FEATURE_WEIGHTS[feature])[:, None])
+
+    for feature in CATEGORICAL_FEATURES:
+        vocab = encoder["categorical"][feature]
+        position = {v: i for i, v in enumerate(vocab)}
+        one_hot = np.zeros((len(rows), len(vocab)), dtype=np.float64)
+        idx = np.array([position.get(categorical_value(r, feature), -1) for r in rows], dtype=np.int64)
+        known = idx >= 0
+        one_hot[np.nonzero(known)[0], idx[known]] = 1.0
+        # Einheitsvektor-Abstand 2 → auf Gewicht skalieren
+        blocks.append(one_hot * (FEATURE_WEIGHTS[feature] / np.sqrt(2.0)))
+
+    return np.hstack(blocks).astype(np.float32)
+
+def feature_slices(encoder: dict) -> Dict[str, slice]:
+    """Spaltenbereich jedes Features in der Matrix (Reihenfolge wie encode)"""
+    slices = {}
+    start = 0
+    for feature, _, _ in NUMERIC_FEATURES:
+        slices[feature] = slice(start, start + 1)
+        start += 1
+    for feature in CATEGORICAL_FEATURES:
+        width = len(encoder["categorical"][feature])
+        slices[feature] = slice(start, start + width)
+        start += width
+    return slices
+
+def missing_features(row: dict) -> Tuple[str, ...]:
+    missing = [f for f, _, _ in NUMERIC_FEATURES if row.get(f) in (None, "")]
+    missing += [f for f in CATEGORICAL_FEATURES if not categorical_value(row, f)]
+    return tuple(missing)
+
+# ===========================================================================
+# NÄCHSTE NACHBARN
+# ===========================================================================
+
+def nearest(queries: np.ndarray, matrix: np.ndarray, k: int,
+            exclude_self: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Blockweise k-NN (euklidisch) für alle Query-Zeilen.
+    Gibt (indices, distanzen) mit Form (len(queries), k) zurück.
+    """
+    n = matrix.shape[0]
+    k = min(k, n - 1 if exclude_self else n)
+    if k <= 0:
+        empty = np.zeros((queries.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+
+    matrix_sq = np.einsum("ij,ij->i", matrix, matrix)
+    block = max(1, BLOCK_ELEMENTS // max(n, 1))
+
+    all_idx = np.empty((queries.shape[0], k), dtype=np.int64)
+    all_dist = np.empty((queries.shape[0], k), dtype=np.float32)
+
+    for start in range(0, queries.shape[0], block):
+        q = queries[start:start + block]
+        dist = np.einsum("ij,ij->i", q, q)[:, None] + matrix_sq[None, :] - 2.0 * (q @ matrix.T)
+        np.maximum(dist, 0.0, out=dist)
+
+        if exclude_self:
+            rows = np.arange(q.shape[0])
+            dist[rows, start + rows] = np.inf
+
+        idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        part = np.take_along_axis(dist, idx, axis=1)
+        order = np.argsort(part, axis=1)
+
+        all_idx[start:start + block] = np.take_along_axis(idx, order, axis=1)
+        all_dist[start:start + block] = np.sqrt(np.take_along_axis(part, order, axis=1))
+
+    return all_idx, all_dist
+
+# ===========================================================================
+# BUILD / SPEICHERN
+# ===========================================================================
+
+def build_index(rows: List[dict], k: int = TOP_K,
+                model_file: str = MODEL_FILE,
+                neighbours_file: str = NEIGHBOURS_FILE) -> Dict[str, List[str]]:
+    """Feature-Matrix + Top-k Nachbarn berechnen und neben dem Snapshot speichern"""
+    rows = [r for r in rows if r.get("expose_id")]
+    ids = np.array([str(r["expose_id"]) for r in rows])
+
+    encoder = fit_encoder(rows)
+    matrix = encode(rows, encoder)
+    idx, dist = nearest(matrix, matrix, k, exclude_self=True)
+
+    np.savez_compressed(
+        model_file,
+        ids=ids,
+        matrix=matrix,
+        neighbours=idx,
+        distances=dist,
+        encoder=np.array(json.dumps(encoder)),
+    )
+
+    neighbours = {ids[i]: ids[idx[i]].tolist() for i in range(len(ids))}
+    with open(neighbours_file, "w", encoding="utf-8") as f:
+        json.dump(neighbours, f, ensure_ascii=False)
+
+    return neighbours
+
+def load_model(model_file: str = MODEL_FILE) -> dict:
+    data = np.load(model_file)
+    return {
+        "ids": data["ids"],
+        "matrix": data["matrix"],
+        "neighbours": data["neighbours"],
+        "distances": data["distances"],
+        "encoder": json.loads(str(data["encoder"])),
+    }
+
+# ===========================================================================
+# QUERY API
+# ===========================================================================
+
+def similar_to(expose_id: str, model: Optional[dict] = None) -> List[str]:
+    """Vorberechnete Nachbarn einer expose_id"""
+    model = model or load_model()
+    hits = np.nonzero(model["ids"] == str(expose_id))[0]
+    if not hits.size:
+        return []
+    return model["ids"][model["neighbours"][hits[0]]].tolist()
+
+def query_similar(criteria: List[dict], k: int = TOP_K,
+                  model: Optional[dict] = None) -> List[List[Tuple[str, float]]]:
+    """
+    Gebündelte Ad-hoc Abfrage.
+    criteria: Liste von Dicts mit Snapshot-Feldern (preis, wohnflaeche, zimmer,
+    kategorie, unterkategorie, plz, region). Fehlende Felder bekommen für
+    diese Abfrage Gewicht 0 - zählen also gar nicht in die Distanz.
+    """
+    model = model or load_model()
+    encoder = model["encoder"]
+    queries = encode(criteria, encoder)
+    matrix = model["matrix"]
+    slices = feature_slices(encoder)
+    ids = model["ids"]
+
+    # Abfragen mit gleichen fehlenden Feldern gemeinsam rechnen
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    for i, row in enumerate(criteria):
+        groups.setdefault(missing_features(row), []).append(i)
+
+    results: List[List[Tuple[str, float]]] = [[] for _ in criteria]
+    for missing, members in groups.items():
+        keep = np.ones(matrix.shape[1], dtype=bool)
+        for feature in missing:
+            keep[slices[feature]] = False
+        idx, dist = nearest(queries[members][:, keep], matrix[:, keep], k)
+        for row, i in enumerate(members):
+            results[i] = [(str(ids[j]), round(float(d), 4)) for j, d in zip(idx[row], dist[row])]
+    return results
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ähnliche Immobilien")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Index aus CSV neu berechnen")
+    build.add_argument("--csv", default=CSV_FILE)
+    build.add_argument("-k", type=int, default=TOP_K)
+
+    query = sub.add_parser("query", help="Ad-hoc Suche nach Kriterien")
+    for field in ("preis", "wohnflaeche", "zimmer", "kategorie", "unterkategorie", "plz", "region"):
+        query.add_argument(f"--{field}", default="")
+    query.add_argument("-k", type=int, default=TOP_K)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        rows = load_rows(args.csv)
+        if not rows:
+            print(f"[ERROR] {args.csv} nicht gefunden oder leer!")
+            sys.exit(1)
+        neighbours = build_index(rows, k=args.k)
+        print(f"[SIMILAR] ✅ {MODEL_FILE}: {len(neighbours)} Listings, k={args.k}")
+    else:
+        criteria = {k: v for k, v in vars(args).items() if k not in ("command", "k")}
+        for expose_id, distance in query_similar([criteria], k=args.k)[0]:
+            print(f"{expose_id}  (Distanz {distance})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Snapshot Helpers
+Gemeinsames Laden des gescrapten CSV-Snapshots für lokale Indizes
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import csv
+from typing import List, Optional
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+CSV_FILE = "immoscout_mutzel.csv"
+
+# Felder, die nur über /expose/{id} (Mobile API) kommen
+DETAIL_FIELDS = (
+    "titel", "beschreibung", "abschnitte", "bilder", "medien", "ausstattung", "baujahr", "energieausweis",
+)
+
+# ===========================================================================
+# LADEN
+# ===========================================================================
+
+def load_rows(csv_file: str = CSV_FILE) -> List[dict]:
+    """Lese den CSV-Snapshot (leere Liste wenn nicht vorhanden)"""
+    if not os.path.exists(csv_file):
+        return []
+
+    with open(csv_file, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return list(reader)
+
+def merge_details(prop: dict, old: dict, details: dict) -> dict:
+    """Listing-Felder neu, Detail-Felder neu oder (falls nicht geholt) vom alten Stand"""
+    merged = dict(prop)
+    if old:
+        merged.update({k: v for k, v in old.items() if k in DETAIL_FIELDS})
+    merged.update(details)
+    return merged
+
+# ===========================================================================
+# ZAHLEN
+# ===========================================================================
+
+def parse_preis(value) -> Optional[float]:
+    """'299.000 €' / '1.250,50 €' → 299000.0 / 1250.5 (None wenn leer)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    clean = str(value or "").replace("€", "").replace("\xa0", "").replace(" ", "").replace(".", "").replace(",", ".")
+    try:
+        return float(clean) if clean else None
+    except ValueError:
+        return None
+
+def parse_float(value) -> Optional[float]:
+    """'85,5 m²' / '3.5' → float (None wenn leer)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    clean = str(value or "").replace("m²", "").replace(" ", "").replace(",", ".")
+    try:
+        return float(clean) if clean else None
+    except ValueError:
+        return None
@@ -8,9 +8,9 @@ Author: Paul Probodziak
 
 import os
 import sys
-import csv
 import json
 import time
+import argparse
 
 try:
     import requests
@@ -19,6 +19,10 @@ except ImportError:
     print("  pip3 install requests --break-system-packages")
     sys.exit(1)
 
+from profiling import Profiler, add_profile_argument
+from media_manifest import select_images
+from columnar_snapshot import iter_snapshot_rows
+
 # ===========================================================================
 # KONFIGURATION
 # ===========================================================================
@@ -28,6 +32,26 @@ AIRTABLE_TOKEN = os.getenv("AIRTABLE_TOKEN", "")
 AIRTABLE_BASE = os.getenv("AIRTABLE_BASE_CHATBOT", "")
 AIRTABLE_TABLE = os.getenv("AIRTABLE_TABLE_CHATBOT", "")
 
+# Optional: Chunk-Tabelle für Beschreibungs-Abschnitte (description_chunks.py)
+# Felder: "Chunk ID", "Objektnummer", "Abschnitt", "Position", "Text"
+AIRTABLE_TABLE_CHUNKS = os.getenv("AIRTABLE_TABLE_CHATBOT_CHUNKS", "")
+
+# API Endpoint (überschreibbar, z.B. für airtable_stub_server.py)
+AIRTABLE_API_URL = os.getenv("AIRTABLE_API_URL", "https://api.airtable.com").rstrip("/")
+
+# Pause zwischen Batches (Airtable Limit: 5 Requests/Sekunde pro Base)
+AIRTABLE_BATCH_DELAY = float(os.getenv("AIRTABLE_BATCH_DELAY", "0.5"))
+
+# Bei 429 (Rate Limit) warten & erneut versuchen
+RATE_LIMIT_BACKOFF = float(os.getenv("AIRTABLE_RATE_LIMIT_BACKOFF", "30"))
+MAX_RETRIES = 3
+
+# HTTP Session (Keep-Alive; pipeline.py teilt eine Session über alle Stages)
+SESSION = requests.Session()
+
+# Requests, die auch nach Retries fehlschlugen (pipeline.py: Stage erfolgreich?)
+failed_requests = 0
+
 # CSV Input
 CSV_FILE = "immoscout_mutzel.csv"
 
@@ -45,9 +69,23 @@ def get_airtable_headers():
         "Content-Type": "application/json",
     }
 
-def get_all_records():
-    """Hole alle existierenden Records aus Airtable"""
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
+def airtable_request(method: str, url: str, **kwargs) -> requests.Response:
+    """Airtable Request mit Retry bei 429 (Rate Limit)"""
+    global failed_requests
+    for attempt in range(MAX_RETRIES + 1):
+        response = SESSION.request(method, url, timeout=30, **kwargs)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            break
+        print(f"  ⏳ Rate Limit (429) - warte {RATE_LIMIT_BACKOFF:.0f}s...")
+        time.sleep(RATE_LIMIT_BACKOFF)
+    
+    if response.status_code >= 400:
+        failed_requests += 1
+    return response
+
+def get_all_records(fields=None, table=None):
+    """Hole alle existierenden Records aus Airtable (optional nur bestimmte Felder)"""
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{table or AIRTABLE_TABLE}"
     headers = get_airtable_headers()
     
     all_records = []
@@ -55,10 +93,12 @@ def get_all_records():
     
     while True:
         params = {}
+        if fields:
+            params["fields[]"] = fields
         if offset:
             params["offset"] = offset
         
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = airtable_request("GET", url, headers=headers, params=params)
         
         if response.status_code != 200:
             print(f"[ERROR] Airtable GET failed: {response.status_code}")
@@ -74,12 +114,12 @@ def get_all_records():
     
     return all_records
 
-def delete_all_records(records):
+def delete_all_records(records, table=None):
     """Lösche alle Records (für sauberen Sync)"""
     if not records:
         return
     
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{table or AIRTABLE_TABLE}"
     headers = get_airtable_headers()
     
     print(f"\n[AIRTABLE] Lösche {len(records)} alte Records...")
@@ -91,18 +131,18 @@ def delete_all_records(records):
         
         # DELETE mit record IDs als Query Params
         params = {"records[]": record_ids}
-        response = requests.delete(url, headers=headers, params=params, timeout=30)
+        response = airtable_request("DELETE", url, headers=headers, params=params)
         
         if response.status_code != 200:
             print(f"  [ERROR] Delete failed: {response.status_code}")
         else:
             print(f"  ✅ Gelöscht: {len(record_ids)} Records")
         
-        time.sleep(0.5)  # Rate limiting
+        time.sleep(AIRTABLE_BATCH_DELAY)  # Rate limiting
 
-def create_records(records):
+def create_records(records, table=None):
     """Erstelle neue Records"""
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{table or AIRTABLE_TABLE}"
     headers = get_airtable_headers()
     
     print(f"\n[AIRTABLE] Erstelle {len(records)} neue Records...")
@@ -112,7 +152,7 @@ def create_records(records):
         batch = records[i:i+10]
         
         payload = {"records": batch}
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = airtable_request("POST", url, headers=headers, json=payload)
         
         if response.status_code != 200:
             print(f"  [ERROR] Create failed: {response.status_code}")
@@ -120,7 +160,29 @@ def create_records(records):
         else:
             print(f"  ✅ Erstellt: {len(batch)} Records")
         
-        time.sleep(0.5)  # Rate limiting
+        time.sleep(AIRTABLE_BATCH_DELAY)  # Rate limiting
+
+def update_records(records, table=None):
+    """Aktualisiere bestehende Records (records mit "id" + "fields")"""
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{table or AIRTABLE_TABLE}"
+    headers = get_airtable_headers()
+    
+    print(f"\n[AIRTABLE] Aktualisiere {len(records)} Records...")
+    
+    # Airtable erlaubt max 10 Updates pro Request
+    for i in range(0, len(records), 10):
+        batch = records[i:i+10]
+        
+        payload = {"records": batch}
+        response = airtable_request("PATCH", url, headers=headers, json=payload)
+        
+        if response.status_code != 200:
+            print(f"  [ERROR] Update failed: {response.status_code}")
+            print(response.text[:500])
+        else:
+            print(f"  ✅ Aktualisiert: {len(batch)} Records")
+        
+        time.sleep(AIRTABLE_BATCH_DELAY)  # Rate limiting
 
 # ===========================================================================
 # CSV → AIRTABLE MAPPING
@@ -134,15 +196,9 @@ def csv_to_airtable_record(row: dict) -> dict:
     if len(beschreibung) > MAX_DESCRIPTION_LENGTH:
         beschreibung = beschreibung[:MAX_DESCRIPTION_LENGTH-3] + "..."
     
-    # Bilder - Nur ERSTE URL als Text (für Chatbot)
-    bilder_str = row.get("bilder", "")
-    erste_bild_url = ""
-    
-    if bilder_str:
-        bilder_list = bilder_str.split("\n")
-        bilder_list = [b.strip() for b in bilder_list if b.strip()]
-        if bilder_list:
-            erste_bild_url = bilder_list[0]  # Nur erste URL
+    # Bilder - Nur ERSTE URL als Text (für Chatbot, Vorschaugröße)
+    bilder_list = select_images(row, "chatbot")
+    erste_bild_url = bilder_list[0] if bilder_list else ""
     
     # Preis - extrahiere nur die Zahl
     preis = row.get("preis", "")
@@ -171,7 +227,7 @@ def csv_to_airtable_record(row: dict) -> dict:
 # MAIN
 # ===========================================================================
 
-def main():
+def run(profiler: Profiler):
     print("=" * 80)
     print("IMMOSCOUT24 → AIRTABLE SYNC (CHATBOT)")
     print("=" * 80)
@@ -201,24 +257,19 @@ def main():
         print("Führe zuerst aus: python3 immoscout_mobile_api_scraper.py")
         return
     
-    with open(CSV_FILE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-    
-    print(f"  ✅ {len(rows)} Immobilien gefunden")
-    
-    # Filter: Nur aktive (nicht "Vermarktet")
-    active_rows = [r for r in rows if r.get("status", "") != "Vermarktet"]
-    print(f"  ✅ {len(active_rows)} aktive Immobilien (ohne Vermarktet)")
-    
-    # Convert to Airtable format
+    # Filter: Nur aktive (nicht "Vermarktet") - mit Spalten-Snapshot als
+    # Maske über die Status-Spalte; Zeilen einzeln dekodiert & konvertiert
     print(f"\n[PHASE 2] Konvertiere zu Airtable Format...")
-    airtable_records = [csv_to_airtable_record(row) for row in active_rows]
-    print(f"  ✅ {len(airtable_records)} Records bereit")
+    with profiler.phase("1+2 Lese & Konvertiere"):
+        airtable_records = [
+            csv_to_airtable_record(row) for row in iter_snapshot_rows(CSV_FILE, active_only=True)
+        ]
+    print(f"  ✅ {len(airtable_records)} Records bereit (nur aktive, ohne Vermarktet)")
     
     # Get existing records
     print(f"\n[PHASE 3] Hole existierende Records...")
-    existing_records = get_all_records()
+    with profiler.phase("3 Hole existierende Records"):
+        existing_records = get_all_records()
     print(f"  ✅ {len(existing_records)} existierende Records")
     
     # Delete old records
@@ -234,11 +285,13 @@ def main():
                 print("Abgebrochen!")
                 return
         
-        delete_all_records(existing_records)
+        with profiler.phase("4 Lösche Records"):
+            delete_all_records(existing_records)
     
     # Create new records
     if airtable_records:
-        create_records(airtable_records)
+        with profiler.phase("5 Erstelle Records"):
+            create_records(airtable_records)
     
     # Summary
     print("\n" + "=" * 80)
@@ -251,5 +304,16 @@ def main():
     print(f"Bilder:    Erste {MAX_IMAGES} Bilder pro Immobilie")
     print("=" * 80)
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ImmoScout24 → Airtable Sync (Chatbot)")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    
+    profiler = Profiler("sync_chatbot", args.profile)
+    try:
+        run(profiler)
+    finally:
+        profiler.write_summary()
+
 if __name__ == "__main__":
     main()
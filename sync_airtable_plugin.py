@@ -3,14 +3,24 @@
 ImmoScout24 → Airtable Sync (PLUGIN Table)
 Synced ALLE Daten für das Website-Plugin
 
+--staged: Zero-Downtime Rebuild über Version-Tag (Feld "sync_version") und
+Meta-Tabelle (AIRTABLE_TABLE_PLUGIN_META, Record key="active_version").
+Das Plugin liest nur Records mit {sync_version} = active_version.
+
+Ist die Meta-Tabelle konfiguriert, taggt auch der normale Sync (Delete-All
++ Create) seine Records und schaltet active_version um - sonst wären die
+Records für versionsfilternde Leser unsichtbar.
+
 Author: Paul Probodziak
 """
 
 import os
 import sys
-import csv
 import json
 import time
+import hashlib
+import argparse
+import threading
 
 try:
     import requests
@@ -19,6 +29,10 @@ except ImportError:
     print("  pip3 install requests --break-system-packages")
     sys.exit(1)
 
+from profiling import Profiler, add_profile_argument
+from media_manifest import select_images
+from columnar_snapshot import iter_snapshot_rows
+
 # ===========================================================================
 # KONFIGURATION
 # ===========================================================================
@@ -28,6 +42,33 @@ AIRTABLE_TOKEN = os.getenv("AIRTABLE_TOKEN", "")
 AIRTABLE_BASE = os.getenv("AIRTABLE_BASE_PLUGIN", "")
 AIRTABLE_TABLE = os.getenv("AIRTABLE_TABLE_PLUGIN", "")
 
+# API Endpoint (überschreibbar, z.B. für airtable_stub_server.py)
+AIRTABLE_API_URL = os.getenv("AIRTABLE_API_URL", "https://api.airtable.com").rstrip("/")
+
+# Pause zwischen Batches (Airtable Limit: 5 Requests/Sekunde pro Base)
+AIRTABLE_BATCH_DELAY = float(os.getenv("AIRTABLE_BATCH_DELAY", "0.5"))
+
+# Staged Rebuild (--staged): Meta-Tabelle mit Feldern "key" / "value",
+# Record key="active_version" zeigt auf die live Version (Feld "sync_version")
+AIRTABLE_TABLE_META = os.getenv("AIRTABLE_TABLE_PLUGIN_META", "")
+VERSION_FIELD = "sync_version"
+
+# Hochgeladene Bilder (upload_images_to_airtable.py) - wird in neue Versionen übernommen
+ATTACHMENT_FIELD = "bilder_attachments"
+
+# Abbruch wenn neuer Snapshot < X% der live Records hat (Scrape kaputt?)
+MIN_ROW_RATIO = float(os.getenv("AIRTABLE_STAGED_MIN_ROW_RATIO", "0.5"))
+
+# Bei 429 (Rate Limit) warten & erneut versuchen
+RATE_LIMIT_BACKOFF = float(os.getenv("AIRTABLE_RATE_LIMIT_BACKOFF", "30"))
+MAX_RETRIES = 3
+
+# HTTP Session (Keep-Alive; pipeline.py teilt eine Session über alle Stages)
+SESSION = requests.Session()
+
+# Requests, die auch nach Retries fehlschlugen (pipeline.py: Stage erfolgreich?)
+failed_requests = 0
+
 # CSV Input
 CSV_FILE = "immoscout_mutzel.csv"
 
@@ -41,9 +82,23 @@ def get_airtable_headers():
         "Content-Type": "application/json",
     }
 
-def get_all_records():
-    """Hole alle existierenden Records"""
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
+def airtable_request(method: str, url: str, **kwargs) -> requests.Response:
+    """Airtable Request mit Retry bei 429 (Rate Limit)"""
+    global failed_requests
+    for attempt in range(MAX_RETRIES + 1):
+        response = SESSION.request(method, url, timeout=30, **kwargs)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            break
+        print(f"  ⏳ Rate Limit (429) - warte {RATE_LIMIT_BACKOFF:.0f}s...")
+        time.sleep(RATE_LIMIT_BACKOFF)
+    
+    if response.status_code >= 400:
+        failed_requests += 1
+    return response
+
+def get_all_records(fields=None, formula=None):
+    """Hole alle existierenden Records (optional nur bestimmte Felder / filterByFormula)"""
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
     headers = get_airtable_headers()
     
     all_records = []
@@ -51,10 +106,14 @@ def get_all_records():
     
     while True:
         params = {}
+        if fields:
+            params["fields[]"] = fields
+        if formula:
+            params["filterByFormula"] = formula
         if offset:
             params["offset"] = offset
         
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = airtable_request("GET", url, headers=headers, params=params)
         
         if response.status_code != 200:
             print(f"[ERROR] Airtable GET failed: {response.status_code}")
@@ -74,7 +133,7 @@ def delete_all_records(records):
     if not records:
         return
     
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
     headers = get_airtable_headers()
     
     print(f"\n[AIRTABLE] Lösche {len(records)} alte Records...")
@@ -84,18 +143,18 @@ def delete_all_records(records):
         record_ids = [r["id"] for r in batch]
         
         params = {"records[]": record_ids}
-        response = requests.delete(url, headers=headers, params=params, timeout=30)
+        response = airtable_request("DELETE", url, headers=headers, params=params)
         
         if response.status_code != 200:
             print(f"  [ERROR] Delete failed: {response.status_code}")
         else:
             print(f"  ✅ Gelöscht: {len(record_ids)} Records")
         
-        time.sleep(0.5)
+        time.sleep(AIRTABLE_BATCH_DELAY)
 
 def create_records(records):
     """Erstelle neue Records"""
-    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
     headers = get_airtable_headers()
     
     print(f"\n[AIRTABLE] Erstelle {len(records)} neue Records...")
@@ -104,7 +163,7 @@ def create_records(records):
         batch = records[i:i+10]
         
         payload = {"records": batch}
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = airtable_request("POST", url, headers=headers, json=payload)
         
         if response.status_code != 200:
             print(f"  [ERROR] Create failed: {response.status_code}")
@@ -112,7 +171,186 @@ def create_records(records):
         else:
             print(f"  ✅ Erstellt: {len(batch)} Records")
         
-        time.sleep(0.5)
+        time.sleep(AIRTABLE_BATCH_DELAY)
+
+def update_records(records):
+    """Aktualisiere bestehende Records (records mit "id" + "fields")"""
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE}"
+    headers = get_airtable_headers()
+    
+    print(f"\n[AIRTABLE] Aktualisiere {len(records)} Records...")
+    
+    for i in range(0, len(records), 10):
+        batch = records[i:i+10]
+        
+        payload = {"records": batch}
+        response = airtable_request("PATCH", url, headers=headers, json=payload)
+        
+        if response.status_code != 200:
+            print(f"  [ERROR] Update failed: {response.status_code}")
+            print(response.text[:500])
+        else:
+            print(f"  ✅ Aktualisiert: {len(batch)} Records")
+        
+        time.sleep(AIRTABLE_BATCH_DELAY)
+
+# ===========================================================================
+# STAGED REBUILD (ZERO-DOWNTIME)
+# ===========================================================================
+
+def get_active_version():
+    """(meta_record_id, active_version) aus der Meta-Tabelle"""
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE_META}"
+    params = {"filterByFormula": "{key}='active_version'", "maxRecords": 1}
+    response = airtable_request("GET", url, headers=get_airtable_headers(), params=params)
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"Meta GET failed: {response.status_code}")
+    
+    records = response.json().get("records", [])
+    if not records:
+        return None, ""
+    return records[0]["id"], records[0].get("fields", {}).get("value", "")
+
+def set_active_version(meta_record_id, version: str):
+    """Atomarer Switch: EIN Record-Update in der Meta-Tabelle"""
+    url = f"{AIRTABLE_API_URL}/v0/{AIRTABLE_BASE}/{AIRTABLE_TABLE_META}"
+    fields = {"key": "active_version", "value": version}
+    
+    if meta_record_id:
+        payload = {"records": [{"id": meta_record_id, "fields": fields}]}
+        response = airtable_request("PATCH", url, headers=get_airtable_headers(), json=payload)
+    else:
+        payload = {"records": [{"fields": fields}]}
+        response = airtable_request("POST", url, headers=get_airtable_headers(), json=payload)
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"Meta Update failed: {response.status_code} {response.text[:300]}")
+
+def normalize_for_checksum(fields: dict) -> dict:
+    """Wie Airtable speichert: leere Werte fehlen, 3.0 == 3"""
+    result = {}
+    for k, v in fields.items():
+        if k == VERSION_FIELD or v in (None, "", []):
+            continue
+        if isinstance(v, float) and v.is_integer():
+            v = int(v)
+        result[k] = v
+    return result
+
+def record_checksums(records, field_names) -> dict:
+    """
+    expose_id → Checksum der (normalisierten) gemappten Felder. Berechnete
+    Felder & Attachments, die Airtable zusätzlich liefert, zählen nicht.
+    """
+    checksums = {}
+    for r in records:
+        mapped = {k: v for k, v in r.get("fields", {}).items() if k in field_names}
+        fields = normalize_for_checksum(mapped)
+        payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+        checksums[fields.get("expose_id", r.get("id"))] = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return checksums
+
+def cleanup_versions(keep_version: str):
+    """Lösche alle Records, die nicht zur live Version gehören"""
+    stale = get_all_records(
+        fields=[VERSION_FIELD],
+        formula=f"{{{VERSION_FIELD}}}!='{keep_version}'",
+    )
+    if stale:
+        delete_all_records(stale)
+
+def new_version() -> str:
+    # Zufalls-Suffix: zwei Läufe in derselben Sekunde dürfen nie dieselbe
+    # Version bekommen (Verifikation/Cleanup würde sonst live Records löschen)
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.urandom(3).hex()}"
+
+def tag_version(airtable_records, version: str):
+    return [{"fields": dict(r["fields"], **{VERSION_FIELD: version})} for r in airtable_records]
+
+def carry_attachments(staged_records, live_records) -> int:
+    """
+    Hochgeladene Bilder (upload_images_to_airtable.py) der live Records in die
+    neue Version übernehmen - sonst zeigt das Plugin nach dem Umschalten bis
+    zum nächsten Upload keine Bilder. Gibt Anzahl übernommener Records zurück.
+    """
+    attachments = {}
+    for r in live_records:
+        fields = r.get("fields", {})
+        if fields.get(ATTACHMENT_FIELD):
+            attachments[fields.get("expose_id")] = [
+                {"url": a["url"], "filename": a.get("filename", "")} for a in fields[ATTACHMENT_FIELD]
+            ]
+    
+    carried = 0
+    for r in staged_records:
+        existing = attachments.get(r["fields"].get("expose_id"))
+        if existing:
+            r["fields"][ATTACHMENT_FIELD] = existing
+            carried += 1
+    return carried
+
+def staged_rebuild(airtable_records, profiler: Profiler) -> bool:
+    """
+    Voll-Rebuild ohne Downtime:
+    1. Neue Version schreiben (live Records bleiben unangetastet)
+    2. Anzahl + Checksums gegen den Snapshot prüfen
+    3. active_version atomar umschalten
+    4. Alte Version im Hintergrund löschen
+    """
+    meta_id, active_version = get_active_version()
+    version = new_version()
+    print(f"\n[STAGED] Live: {active_version or '-'} → Neu: {version}")
+    
+    # Reste abgebrochener Läufe entfernen (live Version bleibt)
+    if active_version:
+        with profiler.phase("3 Cleanup Reste"):
+            cleanup_versions(active_version)
+    live_records = get_all_records(fields=["expose_id", ATTACHMENT_FIELD])
+    live_count = len(live_records)
+    
+    if not airtable_records or len(airtable_records) < live_count * MIN_ROW_RATIO:
+        print(f"[STAGED] ❌ Snapshot hat nur {len(airtable_records)} Records (live: {live_count}) - Abbruch!")
+        return False
+    
+    staged = tag_version(airtable_records, version)
+    carried = carry_attachments(staged, live_records)
+    print(f"[STAGED] 🖼️  Bilder-Anhänge von {carried} live Records übernommen")
+    with profiler.phase("4 Schreibe neue Version"):
+        create_records(staged)
+    
+    # Verifikation gegen den Snapshot - nur die gemappten Spalten anfragen & hashen
+    field_names = list(airtable_records[0]["fields"])
+    with profiler.phase("5 Verifiziere"):
+        written = get_all_records(fields=field_names, formula=f"{{{VERSION_FIELD}}}='{version}'")
+        expected = record_checksums(airtable_records, field_names)
+        actual = record_checksums(written, field_names)
+    
+    mismatches = [eid for eid, checksum in expected.items() if actual.get(eid) != checksum]
+    if len(written) != len(airtable_records) or mismatches:
+        print(f"[STAGED] ❌ Verifikation fehlgeschlagen: {len(written)}/{len(airtable_records)} Records, "
+              f"{len(mismatches)} Checksum-Abweichungen - neue Version wird verworfen")
+        delete_all_records(written)
+        return False
+    print(f"[STAGED] ✅ Verifiziert: {len(written)} Records, Checksums OK")
+    
+    set_active_version(meta_id, version)
+    print(f"[STAGED] ✅ Live-Version umgeschaltet: {version}")
+    
+    # Alte Version im Hintergrund löschen (Leser sehen sie ab jetzt nicht mehr).
+    # Join vor dem Return: fehlgeschlagene Deletes zählen in failed_requests,
+    # damit die Pipeline sie sieht - Reste entfernt sonst der nächste Lauf
+    failed_before = failed_requests
+    cleanup = threading.Thread(target=cleanup_versions, args=(version,), name="cleanup")
+    cleanup.start()
+    print("[STAGED] 🧹 Alte Version wird im Hintergrund gelöscht...")
+    cleanup.join()
+    if failed_requests != failed_before:
+        print(f"[STAGED] ⚠️ Cleanup unvollständig ({failed_requests - failed_before} fehlgeschlagene Requests) "
+              f"- Reste löscht der nächste Lauf")
+    else:
+        print("[STAGED] ✅ Alte Version gelöscht")
+    return True
 
 # ===========================================================================
 # CSV → AIRTABLE MAPPING (PLUGIN)
@@ -121,10 +359,6 @@ def create_records(records):
 def csv_to_airtable_plugin_record(row: dict) -> dict:
     """Konvertiere CSV Row zu Airtable Record (PLUGIN Format - ALLE Felder!)"""
     
-    # DEBUG: Print raw kategorie value
-    raw_kategorie = row.get("kategorie", "")
-    print(f"  [DEBUG] Raw kategorie: {repr(raw_kategorie)}")
-    
     # AGGRESSIVE Quote Stripping!
     def clean_value(val):
         if not val:
@@ -140,8 +374,6 @@ def csv_to_airtable_plugin_record(row: dict) -> dict:
     kategorie_clean = clean_value(row.get("kategorie", ""))
     unterkategorie_clean = clean_value(row.get("unterkategorie", ""))
     
-    print(f"  [DEBUG] Clean kategorie: {repr(kategorie_clean)}")
-    
     # Preis als Zahl
     preis = row.get("preis", "")
     preis_clean = preis.replace(".", "").replace(",00", "").replace("€", "").strip()
@@ -168,16 +400,12 @@ def csv_to_airtable_plugin_record(row: dict) -> dict:
     except:
         baujahr_num = None
     
-    # ALLE Bilder (nicht nur erste)
-    bilder_str = row.get("bilder", "")
-    bilder_urls = ""
-    if bilder_str:
-        bilder_list = bilder_str.split("\n")
-        bilder_list = [b.strip() for b in bilder_list if b.strip()]
-        bilder_urls = "\n".join(bilder_list)  # ALLE Bilder
+    # ALLE Bilder (nicht nur erste) in Galerie-Größe
+    bilder_urls = "\n".join(select_images(row, "plugin_gallery"))
     
-    # Erste Bild URL einzeln
-    erste_bild = bilder_list[0] if bilder_list else ""
+    # Erste Bild URL einzeln (Thumbnail)
+    thumbnails = select_images(row, "plugin_thumbnail")
+    erste_bild = thumbnails[0] if thumbnails else ""
     
     # CONVERSION: "Kaufen" → "Kauf", "Mieten" → "Miete" für Plugin Table
     kategorie_plugin = "Kauf" if kategorie_clean == "Kaufen" else "Miete"
@@ -230,7 +458,8 @@ def csv_to_airtable_plugin_record(row: dict) -> dict:
 # MAIN
 # ===========================================================================
 
-def main():
+def run(profiler: Profiler, staged: bool = False) -> bool:
+    """False wenn der Sync abgebrochen wurde oder die Verifikation fehlschlug"""
     print("=" * 80)
     print("IMMOSCOUT24 → AIRTABLE SYNC (PLUGIN)")
     print("=" * 80)
@@ -238,11 +467,11 @@ def main():
     # Validate Config
     if not AIRTABLE_TOKEN:
         print("\n[ERROR] AIRTABLE_TOKEN nicht gesetzt!")
-        return
+        return False
     
     if not AIRTABLE_BASE or not AIRTABLE_TABLE:
         print("\n[ERROR] AIRTABLE_BASE_PLUGIN oder AIRTABLE_TABLE_PLUGIN nicht gesetzt!")
-        return
+        return False
     
     print(f"\n[CONFIG]")
     print(f"  Base: {AIRTABLE_BASE}")
@@ -253,25 +482,44 @@ def main():
     print(f"\n[PHASE 1] Lese CSV...")
     if not os.path.exists(CSV_FILE):
         print(f"[ERROR] {CSV_FILE} nicht gefunden!")
-        return
-    
-    with open(CSV_FILE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+        return False
     
-    print(f"  ✅ {len(rows)} Immobilien gefunden")
+    # Convert - Spalten-Snapshot (memory-mapped) wenn aktuell, sonst CSV;
+    # Zeilen werden einzeln dekodiert & direkt konvertiert (keine Row-Liste)
+    print(f"\n[PHASE 2] Konvertiere zu Airtable Format...")
+    with profiler.phase("1+2 Lese & Konvertiere"):
+        airtable_records = [csv_to_airtable_plugin_record(row) for row in iter_snapshot_rows(CSV_FILE)]
     
     # PLUGIN: ALLE Immobilien (auch Vermarktet für Referenzen)
-    print(f"  ✅ {len(rows)} Immobilien (inkl. Vermarktet)")
+    print(f"  ✅ {len(airtable_records)} Records bereit (inkl. Vermarktet)")
     
-    # Convert
-    print(f"\n[PHASE 2] Konvertiere zu Airtable Format...")
-    airtable_records = [csv_to_airtable_plugin_record(row) for row in rows]
-    print(f"  ✅ {len(airtable_records)} Records bereit")
+    # Staged Rebuild: neue Version schreiben, prüfen, atomar umschalten
+    if staged:
+        if not AIRTABLE_TABLE_META:
+            print("\n[ERROR] --staged braucht AIRTABLE_TABLE_PLUGIN_META!")
+            return False
+        
+        ok = staged_rebuild(airtable_records, profiler)
+        
+        print("\n" + "=" * 80)
+        print("✅ STAGED SYNC ABGESCHLOSSEN!" if ok else "❌ STAGED SYNC ABGEBROCHEN - live Version unverändert")
+        print("=" * 80)
+        print(f"Records:   {len(airtable_records)} (inkl. Vermarktet)")
+        print(f"Modus:     Staged (Version-Flag in {AIRTABLE_TABLE_META})")
+        print("=" * 80)
+        return ok
+    
+    # Mit Meta-Tabelle: auch hier versioniert schreiben & umschalten
+    version = ""
+    if AIRTABLE_TABLE_META:
+        meta_id, _ = get_active_version()
+        version = new_version()
+        airtable_records = tag_version(airtable_records, version)
     
     # Get existing
     print(f"\n[PHASE 3] Hole existierende Records...")
-    existing_records = get_all_records()
+    with profiler.phase("3 Hole existierende Records"):
+        existing_records = get_all_records()
     print(f"  ✅ {len(existing_records)} existierende Records")
     
     # Delete old
@@ -284,13 +532,19 @@ def main():
             confirm = input(f"\n⚠️  {len(existing_records)} Records löschen? (j/n): ")
             if confirm.lower() != "j":
                 print("Abgebrochen!")
-                return
+                return False
         
-        delete_all_records(existing_records)
+        with profiler.phase("4 Lösche Records"):
+            delete_all_records(existing_records)
     
     # Create new
     if airtable_records:
-        create_records(airtable_records)
+        with profiler.phase("5 Erstelle Records"):
+            create_records(airtable_records)
+    
+    if version:
+        set_active_version(meta_id, version)
+        print(f"\n[AIRTABLE] ✅ Live-Version: {version}")
     
     # Summary
     print("\n" + "=" * 80)
@@ -301,6 +555,24 @@ def main():
     print(f"Status:    ALLE Immobilien (inkl. Vermarktet)")
     print(f"Plugin:    Vollständige Daten für Website")
     print("=" * 80)
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ImmoScout24 → Airtable Sync (Plugin)")
+    parser.add_argument(
+        "--staged", action="store_true",
+        help="Zero-Downtime Rebuild: neue Version schreiben, prüfen, atomar umschalten",
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    
+    profiler = Profiler("sync_plugin", args.profile)
+    try:
+        ok = run(profiler, staged=args.staged)
+    finally:
+        profiler.write_summary()
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,96 +1,140 @@
 #!/usr/bin/env python3
 """
 Upload images from Airtable text field to Attachment field
-Reads URLs from 'bilder' field, uploads to 'bilder_attachments'
+Picks preview-size URLs from the snapshot media manifest (falls back to
+the 'bilder' field), uploads to 'bilder_attachments'
 """
 
 import os
 import sys
+import argparse
 from pyairtable import Api
 
+from profiling import Profiler, add_profile_argument
+from snapshot import CSV_FILE, load_rows
+from media_manifest import select_images, CONSUMER_IMAGE_PROFILES
+from image_url_validator import load_cache, is_dead
+from sync_airtable_plugin import VERSION_FIELD
+
 # Get credentials from environment
 AT_TOKEN = os.getenv('AIRTABLE_TOKEN')
 AT_BASE = os.getenv('AIRTABLE_BASE_PLUGIN')
 AT_TABLE = os.getenv('AIRTABLE_TABLE_PLUGIN')
+AT_API_URL = os.getenv('AIRTABLE_API_URL', 'https://api.airtable.com')
+# Staged plugin table: only records of the live version (see sync_airtable_plugin.py)
+AT_META_TABLE = os.getenv('AIRTABLE_TABLE_PLUGIN_META')
+
+def configured() -> bool:
+    return all([AT_TOKEN, AT_BASE, AT_TABLE])
 
-if not all([AT_TOKEN, AT_BASE, AT_TABLE]):
-    print("❌ Missing environment variables!")
-    print("Required: AIRTABLE_TOKEN, AIRTABLE_BASE_PLUGIN, AIRTABLE_TABLE_PLUGIN")
-    sys.exit(1)
+def live_version_formula(api) -> str:
+    """filterByFormula for the live version ('' = table is not versioned)"""
+    if not AT_META_TABLE:
+        return ''
+    meta = api.table(AT_BASE, AT_META_TABLE).first(formula="{key}='active_version'")
+    version = meta['fields'].get('value', '') if meta else ''
+    return f"{{{VERSION_FIELD}}}='{version}'" if version else ''
 
-def main():
+def run(profiler: Profiler) -> bool:
+    """Returns True if every record was updated or skipped without errors"""
     print("🔄 Starting image upload to Airtable...")
     
-    api = Api(AT_TOKEN)
+    api = Api(AT_TOKEN, endpoint_url=AT_API_URL)
     table = api.table(AT_BASE, AT_TABLE)
     
+    # Media manifest from the local snapshot (expose_id -> row)
+    snapshot = {r["expose_id"]: r for r in load_rows(CSV_FILE)}
+    max_images = CONSUMER_IMAGE_PROFILES["airtable"]["count"]
+    # URLs known to be dead (HEAD check cache) - Airtable could not ingest them
+    url_cache = load_cache()
+    
     # Get all records
     print("📥 Fetching records...")
-    records = table.all()
+    with profiler.phase("1 Fetch records"):
+        # Old versions are being deleted in the background - never touch them
+        formula = live_version_formula(api)
+        records = table.all(formula=formula) if formula else table.all()
     print(f"Found {len(records)} records")
     
     updated_count = 0
     skipped_count = 0
     error_count = 0
     
-    for record in records:
-        fields = record['fields']
-        expose_id = fields.get('expose_id', record['id'])
+    with profiler.phase("2 Upload attachments"):
+        for record in records:
+            fields = record['fields']
+            expose_id = fields.get('expose_id', record['id'])
         
-        # Skip if already has attachments
-        if fields.get('bilder_attachments'):
-            print(f"⏭️  {expose_id} - already has attachments")
-            skipped_count += 1
-            continue
+            # Skip if already has attachments
+            if fields.get('bilder_attachments'):
+                print(f"⏭️  {expose_id} - already has attachments")
+                skipped_count += 1
+                continue
         
-        # Get image URLs from bilder field (newline-separated)
-        bilder_text = fields.get('bilder', '')
-        if not bilder_text:
-            print(f"⏭️  {expose_id} - no images")
-            skipped_count += 1
-            continue
+            # Preview-size URLs from the manifest, else bilder field (newline-separated)
+            row = snapshot.get(str(fields.get('expose_id', '')))
+            if row and row.get('medien'):
+                image_urls = select_images(row, 'airtable')
+            else:
+                bilder_text = fields.get('bilder', '')
+                image_urls = [url.strip() for url in bilder_text.split('\n') if url.strip()]
+            image_urls = [url for url in image_urls if not is_dead(url_cache.get(url))]
         
-        # Parse URLs
-        image_urls = [url.strip() for url in bilder_text.split('\n') if url.strip()]
+            if not image_urls:
+                print(f"⏭️  {expose_id} - no images")
+                skipped_count += 1
+                continue
         
-        if not image_urls:
-            print(f"⏭️  {expose_id} - no valid URLs")
-            skipped_count += 1
-            continue
+            print(f"📸 {expose_id} - uploading {len(image_urls)} images")
         
-        print(f"📸 {expose_id} - uploading {len(image_urls)} images")
-        
-        # Create attachment objects
-        # Airtable will download from these URLs and host them
-        attachments = []
-        for url in image_urls[:10]:  # Max 10 images
-            try:
-                attachments.append({"url": url})
-            except Exception as e:
-                print(f"   ⚠️  Error with URL {url}: {e}")
+            # Create attachment objects
+            # Airtable will download from these URLs and host them
+            attachments = []
+            for url in image_urls[:max_images]:
+                try:
+                    attachments.append({"url": url})
+                except Exception as e:
+                    print(f"   ⚠️  Error with URL {url}: {e}")
         
-        if not attachments:
-            print(f"❌ {expose_id} - no valid attachments")
-            error_count += 1
-            continue
+            if not attachments:
+                print(f"❌ {expose_id} - no valid attachments")
+                error_count += 1
+                continue
         
-        try:
-            # Update record with attachments
-            table.update(record['id'], {
-                'bilder_attachments': attachments
-            })
-            print(f"✅ {expose_id} - uploaded {len(attachments)} images")
-            updated_count += 1
+            try:
+                # Update record with attachments
+                table.update(record['id'], {
+                    'bilder_attachments': attachments
+                })
+                print(f"✅ {expose_id} - uploaded {len(attachments)} images")
+                updated_count += 1
             
-        except Exception as e:
-            print(f"❌ {expose_id} - error updating: {e}")
-            error_count += 1
+            except Exception as e:
+                print(f"❌ {expose_id} - error updating: {e}")
+                error_count += 1
     
     print("\n" + "="*50)
     print(f"✅ Updated: {updated_count}")
     print(f"⏭️  Skipped: {skipped_count}")
     print(f"❌ Errors: {error_count}")
     print("="*50)
+    return error_count == 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upload images to Airtable attachments")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    
+    if not configured():
+        print("❌ Missing environment variables!")
+        print("Required: AIRTABLE_TOKEN, AIRTABLE_BASE_PLUGIN, AIRTABLE_TABLE_PLUGIN")
+        sys.exit(1)
+    
+    profiler = Profiler("upload_images", args.profile)
+    try:
+        run(profiler)
+    finally:
+        profiler.write_summary()
 
 if __name__ == '__main__':
     main()
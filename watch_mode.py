@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+ImmoScout24 Watch-Modus (Daemon)
+Pollt alle paar Minuten NUR die günstige searchlistings API
+
+Neue oder geänderte Listings (Preis, Fläche, Status, ...) bekommen Details
+via Mobile API, werden gezielt nach Airtable gepusht (Chatbot + Plugin)
+und erst danach in den CSV-Snapshot übernommen. Kein Full-Scrape, kein
+Delete-All; entfernt wird nur nach vollständigem Listing-Abruf.
+
+Nutzung:
+  python3 watch_mode.py            # Endlosschleife
+  python3 watch_mode.py --once     # Ein Poll (z.B. für Cron)
+
+Author: Paul Probodziak / Sunside AI
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+from typing import List, Dict, Tuple
+
+import immoscout_mobile_api_scraper as scraper
+import sync_airtable_chatbot as chatbot
+import sync_airtable_plugin as plugin
+from snapshot import CSV_FILE, load_rows, merge_details
+from refresh_scheduler import load_state, save_state, mark_refreshed
+from plz_geo_index import annotate as annotate_geo
+from description_chunks import update_chunks, active_rows, CHUNK_FILE
+
+# ===========================================================================
+# KONFIGURATION
+# ===========================================================================
+
+POLL_INTERVAL = int(os.getenv("WATCH_POLL_INTERVAL", "300"))  # Sekunden
+
+# Felder aus searchlistings, deren Änderung einen Detail-Refresh auslöst
+LISTING_FIELDS = (
+    "kategorie", "unterkategorie", "preis", "wohnflaeche", "zimmer",
+    "plz", "ort", "region", "status",
+)
+
+# Schutz vor API-Aussetzern: verschwinden mehr als X% der Listings auf einmal,
+# wird in diesem Poll nichts gelöscht
+MAX_REMOVAL_RATIO = 0.5
+
+# ===========================================================================
+# DIFF
+# ===========================================================================
+
+def fingerprint(prop: dict) -> str:
+    payload = json.dumps([str(prop.get(f, "")) for f in LISTING_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def diff_listings(known: Dict[str, dict], current: List[dict]) -> Tuple[List[str], List[str], List[str]]:
+    """(neu, geändert, entfernt) expose_ids zwischen Snapshot und aktuellem Poll"""
+    current_ids = {p["expose_id"] for p in current}
+
+    new = [p["expose_id"] for p in current if p["expose_id"] not in known]
+    changed = [
+        p["expose_id"] for p in current
+        if p["expose_id"] in known and fingerprint(p) != fingerprint(known[p["expose_id"]])
+    ]
+    removed = [expose_id for expose_id in known if expose_id not in current_ids]
+
+    return new, changed, removed
+
+# ===========================================================================
+# AIRTABLE PUSH
+# ===========================================================================
+
+def airtable_configured(module) -> bool:
+    return bool(module.AIRTABLE_TOKEN and module.AIRTABLE_BASE and module.AIRTABLE_TABLE)
+
+def push_changes(module, key_field: str, records: Dict[str, dict], removed_ids: List[str],
+                 formula: str = ""):
+    """
+    Gezielter Sync einer Tabelle:
+    records = expose_id → Airtable Record ({"fields": ...}) für neue/geänderte IDs
+    removed_ids = expose_ids, die aus der Tabelle verschwinden sollen
+    formula = optionaler filterByFormula (z.B. nur live Version)
+    """
+    if formula:
+        existing = module.get_all_records(fields=[key_field], formula=formula)
+    else:
+        existing = module.get_all_records(fields=[key_field])
+    record_ids = {r.get("fields", {}).get(key_field): r["id"] for r in existing}
+
+    to_create = [rec for eid, rec in records.items() if eid not in record_ids]
+    to_update = [
+        {"id": record_ids[eid], "fields": rec["fields"]}
+        for eid, rec in records.items() if eid in record_ids
+    ]
+    to_delete = [{"id": record_ids[eid]} for eid in removed_ids if eid in record_ids]
+
+    if to_update:
+        module.update_records(to_update)
+    if to_create:
+        module.create_records(to_create)
+    if to_delete:
+        module.delete_all_records(to_delete)
+
+def push_to_airtable(rows: Dict[str, dict], touched: List[str], removed: List[str]) -> bool:
+    """Gibt False zurück, wenn ein Airtable Request fehlgeschlagen ist"""
+    failed_before = (chatbot.failed_requests, plugin.failed_requests)
+
+    # CHATBOT: nur aktive Immobilien (Vermarktet → entfernen)
+    if airtable_configured(chatbot):
+        active = {
+            eid: chatbot.csv_to_airtable_record(rows[eid])
+            for eid in touched if rows[eid].get("status") != "Vermarktet"
+        }
+        gone = removed + [eid for eid in touched if eid not in active]
+        print(f"\n[CHATBOT] {len(active)} Upserts, {len(gone)} Entfernungen")
+        push_changes(chatbot, "Objektnummer", active, gone)
+    else:
+        print("\n[CHATBOT] ⏭️  Airtable nicht konfiguriert")
+
+    # PLUGIN: alle Immobilien
+    if airtable_configured(plugin):
+        records = {eid: plugin.csv_to_airtable_plugin_record(rows[eid]) for eid in touched}
+
+        # Versionierte Tabelle: nur live Records abgleichen, neue Records taggen
+        formula = ""
+        if plugin.AIRTABLE_TABLE_META:
+            _, version = plugin.get_active_version()
+            if version:
+                formula = f"{{{plugin.VERSION_FIELD}}}='{version}'"
+                for rec in records.values():
+                    rec["fields"][plugin.VERSION_FIELD] = version
+        print(f"\n[PLUGIN] {len(records)} Upserts, {len(removed)} Entfernungen")
+        push_changes(plugin, "expose_id", records, removed, formula)
+    else:
+        print("\n[PLUGIN] ⏭️  Airtable nicht konfiguriert")
+
+    return (chatbot.failed_requests, plugin.failed_requests) == failed_before
+
+# ===========================================================================
+# POLL
+# ===========================================================================
+
+def poll_once(csv_file: str = CSV_FILE) -> int:
+    """Ein Poll-Durchlauf. Gibt die Anzahl verarbeiteter Änderungen zurück."""
+    known = {r["expose_id"]: r for r in load_rows(csv_file)}
+
+    failed_before = scraper.failed_listing_requests
+    active, references = scraper.collect_all_listings()
+    current = [scraper.parse_listing(l) for l in active + references]
+
+    if not current:
+        print("⚠️ Keine Listings von der API - überspringe Poll")
+        return 0
+
+    new, changed, removed = diff_listings(known, current)
+    print(f"[WATCH] Neu: {len(new)} | Geändert: {len(changed)} | Entfernt: {len(removed)}")
+
+    # Entfernen nur nach vollständigem, fehlerfreiem Listing-Abruf - eine
+    # fehlende Kombination (z.B. RENT/COMMERCIAL) wäre sonst "verschwunden"
+    if removed and scraper.failed_listing_requests != failed_before:
+        print(f"⚠️ Listing-Abruf unvollständig - {len(removed)} Entfernungen ausgesetzt")
+        removed = []
+    elif known and len(removed) > len(known) * MAX_REMOVAL_RATIO:
+        print(f"⚠️ {len(removed)} von {len(known)} Listings verschwunden - Entfernen ausgesetzt")
+        removed = []
+
+    touched = new + changed
+    if not touched and not removed:
+        return 0
+
+    # Details nur für neue/geänderte IDs
+    details = {}
+    state = load_state()
+    for i, expose_id in enumerate(touched, 1):
+        print(f"\n[{i}/{len(touched)}]")
+        fetched = scraper.get_details_from_mobile_api(expose_id)
+        if fetched:
+            details[expose_id] = fetched
+            mark_refreshed(state, expose_id)
+        if i < len(touched):
+            time.sleep(random.uniform(2, 4))
+
+    # Ohne Details bleibt der alte Stand (und damit der alte Fingerprint) -
+    # der nächste Poll sieht die ID erneut als neu/geändert
+    failed = [eid for eid in touched if eid not in details]
+    if failed:
+        print(f"⚠️ {len(failed)} Detail-Abrufe fehlgeschlagen - nächster Poll wiederholt")
+        touched = [eid for eid in touched if eid in details]
+        if not touched and not removed:
+            return 0
+
+    # Snapshot in API-Reihenfolge neu aufbauen (aktiv zuerst, dann Referenzen).
+    # Neue Rows in CSV-Form bringen (Strings wie im Snapshot), sonst scheitert
+    # das Mapping der Sync-Skripte an rohen API-Typen (z.B. float Wohnfläche)
+    rows = {}
+    for prop in current:
+        eid = prop["expose_id"]
+        if eid in details:
+            rows[eid] = scraper.to_csv_row(merge_details(prop, known.get(eid, {}), details[eid]))
+        elif eid in known:
+            rows[eid] = known[eid]
+
+    # Ausgesetzte Entfernungen bleiben im Snapshot
+    for eid, row in known.items():
+        if eid not in rows and eid not in removed:
+            rows[eid] = row
+
+    # lat/lon auch für übernommene Rows (älterer Snapshot ohne Geo-Spalten)
+    annotate_geo(list(rows.values()))
+    # Neue Bild-URLs prüfen (bekannte kommen aus dem Cache)
+    print(f"[IMAGES] {scraper.validate_images(list(rows.values()))}")
+
+    # Erst pushen, dann persistieren: schlägt der Push fehl, bleibt der alte
+    # Snapshot stehen und der nächste Poll sieht denselben Diff erneut
+    if not push_to_airtable(rows, touched, removed):
+        print("⚠️ Airtable Push fehlgeschlagen - Snapshot unverändert, nächster Poll wiederholt")
+        return 0
+
+    scraper.export_csv(list(rows.values()), csv_file)
+    if csv_file == CSV_FILE:
+        scraper.write_columnar(list(rows.values()))
+    save_state(state, keep_ids=rows.keys())
+    stats = scraper.update_index(list(rows.values()))
+    print(f"[INDEX] ✅ {scraper.INDEX_FILE}: {stats}")
+    scraper.build_similar_index(list(rows.values()))
+    stats = update_chunks(active_rows(list(rows.values())))
+    print(f"[CHUNKS] ✅ {CHUNK_FILE}: {stats}")
+
+    return len(touched) + len(removed)
+
+# ===========================================================================
+# MAIN
+# ===========================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ImmoScout24 Watch-Modus")
+    parser.add_argument("--once", action="store_true", help="Nur ein Poll")
+    parser.add_argument("--interval", type=int, default=POLL_INTERVAL, help="Sekunden zwischen Polls")
+    args = parser.parse_args(argv)
+
+    print("=" * 80)
+    print(f"IMMOSCOUT24 WATCH-MODUS - Poll alle {args.interval}s")
+    print("=" * 80)
+
+    if not os.path.exists(CSV_FILE):
+        print(f"[ERROR] {CSV_FILE} nicht gefunden!")
+        print("Führe zuerst aus: python3 immoscout_mobile_api_scraper.py")
+        sys.exit(1)
+
+    while True:
+        started = time.time()
+        print(f"\n[WATCH] Poll {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+        try:
+            processed = poll_once()
+            print(f"[WATCH] ✅ {processed} Änderungen verarbeitet")
+        except Exception as e:
+            print(f"[WATCH] [ERROR] Poll failed: {e}")
+
+        if args.once:
+            break
+
+        time.sleep(max(0, args.interval - (time.time() - started)))
+
+if __name__ == "__main__":
+    main()